@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -96,9 +97,131 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'), 
+        # Seconds a worker thread keeps its connection between requests,
+        # 0 closes it after each request. Reused connections are checked
+        # before the request uses them.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Set DB_POOL_MAX_SIZE to share a psycopg 3 connection pool between the
+# threads of each worker process instead, which also suits ASGI. Pooled
+# connections are checked on checkout, requests wait up to DB_POOL_TIMEOUT
+# seconds for one, and connections idle for DB_POOL_MAX_IDLE seconds are
+# closed down to DB_POOL_MIN_SIZE.
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+if DB_POOL_MAX_SIZE:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+        },
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory cache is per process, use the file based cache to
+# share cached responses between workers on a host.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # Login throttle counters, kept apart so clearing cached responses
+    # does not reset them. Point it at memcached or Redis to share the
+    # counters between hosts, they need an atomic incr().
+    'throttle': {
+        'BACKEND': os.environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+    # Authenticated tokens and token epochs, shared by every worker so
+    # revoking one reaches them all. Left as a LocMemCache it is not
+    # used, as each process would keep revoked entries of its own.
+    'auth': {
+        'BACKEND': os.environ.get(
+            'AUTH_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('AUTH_CACHE_LOCATION', 'auth'),
+    },
+}
+
+# Seconds an authenticated token stays in the `auth` cache.
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300)
+)
+# Seconds a token stays in each process's cache, how long another worker
+# may keep accepting a revoked token, and the entries each process keeps.
+AUTH_TOKEN_LOCAL_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_LOCAL_CACHE_TTL', 5)
+)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(
+    os.environ.get('AUTH_TOKEN_LOCAL_CACHE_SIZE', 10000)
+)
+
+# Seconds signed access and refresh tokens stay valid.
+AUTH_ACCESS_TOKEN_LIFETIME = int(
+    os.environ.get('AUTH_ACCESS_TOKEN_LIFETIME', 300)
+)
+AUTH_REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get('AUTH_REFRESH_TOKEN_LIFETIME', 14 * 24 * 3600)
+)
+
+# Seconds a recipe API response stays cached, 0 disables the cache.
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)
+)
+
+# Seconds a user's data version is kept when the default cache is a
+# per-process LocMemCache. Other workers do not see its bumps, so this
+# bounds how long they serve cached responses and 304s for old data.
+RECIPE_LOCAL_VERSION_TTL = int(
+    os.environ.get('RECIPE_LOCAL_VERSION_TTL', 5)
+)
+
+# Largest number of recipes accepted by one batch request.
+RECIPE_BATCH_MAX_SIZE = int(os.environ.get('RECIPE_BATCH_MAX_SIZE', 1000))
+
+# Recipes fetched per database round trip while streaming an export.
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+# Processes resizing uploaded recipe images, 0 resizes inside the request.
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+
+# Serve the recipe, tag and ingredient reads from async views with the
+# async ORM. app/asgi.py turns this on, WSGI servers keep the sync views.
+RECIPE_ASYNC_VIEWS = bool(int(os.environ.get('RECIPE_ASYNC_VIEWS', 0)))
+
+# How the media view hands files to the front proxy: 'x-accel-redirect'
+# (nginx), 'x-sendfile' (Apache, lighttpd) or unset to stream them itself.
+RECIPE_MEDIA_SENDFILE = os.environ.get('RECIPE_MEDIA_SENDFILE')
+# Internal proxy location mapped to MEDIA_ROOT for X-Accel-Redirect.
+RECIPE_MEDIA_ACCEL_PREFIX = os.environ.get(
+    'RECIPE_MEDIA_ACCEL_PREFIX', '/protected-media/'
+)
+
+# Dotted path of the recipe search engine, by default PostgreSQL full-text
+# search on PostgreSQL and a portable engine on other databases.
+RECIPE_SEARCH_ENGINE = os.environ.get('RECIPE_SEARCH_ENGINE')
+
+# Dotted path of the tag/ingredient autocomplete engine, by default
+# trigram indexes on PostgreSQL and an in-process sorted index elsewhere.
+RECIPE_AUTOCOMPLETE_ENGINE = os.environ.get('RECIPE_AUTOCOMPLETE_ENGINE')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -135,7 +258,8 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = '/static/static/'
-MEDIA_URL = 'static/media/'
+# Media is served by the recipe media view, which checks ownership.
+MEDIA_URL = '/api/recipe/media/'
 
 MEDIA_ROOT = 'vol/web/media'
 STATIC_ROOT = 'vol/web/static'
@@ -149,6 +273,21 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies in front of the app whose X-Forwarded-For entries are
+    # trusted. With 0 clients are told apart by REMOTE_ADDR, as the
+    # header is whatever the client sent.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    # Attempts allowed per sliding window on the token and sign up
+    # endpoints, checked before any password is hashed.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_THROTTLE_IP_RATE', '10/min'),
+        'login_email': os.environ.get('LOGIN_THROTTLE_EMAIL_RATE', '5/min'),
+        'signup_ip': os.environ.get('SIGNUP_THROTTLE_IP_RATE', '10/min'),
+        'signup_email': os.environ.get(
+            'SIGNUP_THROTTLE_EMAIL_RATE', '5/min'
+        ),
+        'refresh_ip': os.environ.get('REFRESH_THROTTLE_IP_RATE', '30/min'),
+    },
 }
 
 # For Images
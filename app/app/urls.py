@@ -17,8 +17,8 @@ Including another URLconf
 from drf_spectacular.views import SpectacularAPIView , SpectacularSwaggerView
 from django.contrib import admin
 from django.urls import path , include
-from django.conf.urls.static import static
-from django.conf import settings
+
+from core.views import DatabaseStatsView
 
 
 urlpatterns = [
@@ -27,10 +27,8 @@ urlpatterns = [
     path('api/docs/',SpectacularSwaggerView.as_view(url_name='api-schema'),name='api-docs'),
     path('api/user/',include('user.urls')),
     path('api/recipe/',include('recipe.urls')),
+    path(
+        'api/stats/database/', DatabaseStatsView.as_view(),
+        name='database-stats',
+    ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root = settings.MEDIA_ROOT,
-    )
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+Token authentication that avoids per-request database lookups.
+
+Opaque DRF tokens are looked up in a small in-process LRU, then in the
+`auth` cache, and only then in the database. Shared entries are deleted
+when a token is deleted or its user changes. In-process entries of
+other workers expire after AUTH_TOKEN_LOCAL_CACHE_TTL seconds, which
+bounds how long they accept a revoked token. The `auth` cache is
+skipped when it is a per-process LocMemCache, as a delete would not
+reach the other workers.
+
+Signed access tokens carry the user id and the user's token epoch, and
+are checked with HMAC alone. Bumping the epoch revokes every signed
+token of the user, and the epoch is cached the same way.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from core.caching import shared_cache
+
+ACCESS_TOKEN_SALT = 'core.authentication.access'
+REFRESH_TOKEN_SALT = 'core.authentication.refresh'
+# Epoch of users that are missing or inactive, matching no token.
+REVOKED_EPOCH = -1
+
+
+def token_cache_key(key):
+    """Return the shared cache key for a token, without the token."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}'
+
+
+class LocalCache:
+    """Thread safe LRU with a time to live."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Cache a value."""
+        expires = time.monotonic() + settings.AUTH_TOKEN_LOCAL_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_LOCAL_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Forget a key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Forget every key."""
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalCache()
+local_epochs = LocalCache()
+
+
+def _shared_get(key):
+    """Return a value of the `auth` cache, or None when not shared."""
+    cache = shared_cache('auth')
+    return None if cache is None else cache.get(key)
+
+
+def _shared_set(key, value):
+    """Store a value in the `auth` cache when it is shared."""
+    cache = shared_cache('auth')
+    if cache is not None:
+        cache.set(key, value, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+def _shared_delete(key):
+    """Delete a key of the `auth` cache when it is shared."""
+    cache = shared_cache('auth')
+    if cache is not None:
+        cache.delete(key)
+
+
+def invalidate_token(key):
+    """Drop a token from both cache levels."""
+    local_tokens.delete(key)
+    _shared_delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the database for known tokens."""
+
+    def authenticate_credentials(self, key):
+        user = local_tokens.get(key)
+        if user is None:
+            cache_key = token_cache_key(key)
+            user = _shared_get(cache_key)
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                _shared_set(cache_key, user)
+            local_tokens.set(key, user)
+
+        # Each request gets its own copy to change.
+        user = copy.copy(user)
+        return (user, Token(key=key, user=user))
+
+
+def _epoch_cache_key(user_id):
+    """Return the shared cache key of a user's token epoch."""
+    return f'auth:epoch:{user_id}'
+
+
+def get_token_epoch(user_id):
+    """Return the current token epoch of a user."""
+    epoch = local_epochs.get(user_id)
+    if epoch is None:
+        key = _epoch_cache_key(user_id)
+        epoch = _shared_get(key)
+        if epoch is None:
+            epoch = get_user_model().objects.filter(
+                pk=user_id, is_active=True
+            ).values_list('token_epoch', flat=True).first()
+            if epoch is None:
+                epoch = REVOKED_EPOCH
+            _shared_set(key, epoch)
+        local_epochs.set(user_id, epoch)
+    return epoch
+
+
+def invalidate_token_epoch(user_id):
+    """Drop a user's cached token epoch from both cache levels."""
+    local_epochs.delete(user_id)
+    _shared_delete(_epoch_cache_key(user_id))
+
+
+def issue_signed_tokens(user):
+    """Return a new signed access and refresh token for a user."""
+    payload = [user.pk, user.token_epoch]
+    return {
+        'access': signing.dumps(payload, salt=ACCESS_TOKEN_SALT),
+        'refresh': signing.dumps(payload, salt=REFRESH_TOKEN_SALT),
+        'expires_in': settings.AUTH_ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def read_signed_token(token, salt, max_age):
+    """Return the (user id, epoch) of a signed token.
+
+    Raises signing.BadSignature for a forged, malformed or expired one.
+    """
+    try:
+        user_id, epoch = signing.loads(token, salt=salt, max_age=max_age)
+    except (TypeError, ValueError):
+        raise signing.BadSignature('Malformed token.')
+    return user_id, epoch
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate `Bearer <access token>` without a database query.
+
+    The user is given with only its id loaded, other fields load on
+    first access.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid bearer header.')
+            )
+
+        try:
+            user_id, epoch = read_signed_token(
+                auth[1].decode(),
+                ACCESS_TOKEN_SALT,
+                settings.AUTH_ACCESS_TOKEN_LIFETIME,
+            )
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed(
+                _('Invalid or expired token.')
+            )
+        if get_token_epoch(user_id) != epoch:
+            raise exceptions.AuthenticationFailed(_('Token was revoked.'))
+
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, ['id'], [user_id])
+        return (user, auth[1].decode())
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,17 @@
+"""
+Caches shared between worker processes.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def shared_cache(alias):
+    """Return the cache `alias`, or None when it is local to the process.
+
+    Entries deleted from a LocMemCache stay in the other workers' copies,
+    so data that must be invalidated everywhere cannot be kept in one.
+    """
+    cache = caches[alias]
+    if isinstance(cache, LocMemCache):
+        return None
+    return cache
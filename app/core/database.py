@@ -0,0 +1,58 @@
+"""
+Statistics of this process's database connections.
+
+Pooled aliases report their psycopg pool counters. The others count the
+connections opened, which stays flat while persistent connections are
+being reused.
+"""
+import threading
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Pool statistics exported, by psycopg_pool get_stats() key.
+POOL_STATS = {
+    'pool_max': 'max_size',
+    'pool_size': 'size',
+    'pool_available': 'available',
+    'requests_waiting': 'waiting',
+    'requests_num': 'checkouts',
+    'requests_queued': 'waits',
+    'requests_wait_ms': 'wait_ms',
+    'requests_errors': 'timeouts',
+    'returns_bad': 'bad_returns',
+    'connections_num': 'connections_opened',
+    'connections_errors': 'connection_errors',
+    'connections_lost': 'connections_lost',
+}
+
+_opened = Counter()
+_lock = threading.Lock()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Count a new database connection."""
+    with _lock:
+        _opened[connection.alias] += 1
+
+
+def connection_stats():
+    """Return the connection statistics of each database alias."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            stats[alias] = {
+                'pooled': False,
+                'connections_opened': _opened[alias],
+            }
+            continue
+        # Counters are only present once they have been incremented.
+        counters = pool.get_stats()
+        stats[alias] = {'pooled': True} | {
+            name: counters.get(key, 0) for key, name in POOL_STATS.items()
+        }
+    return stats
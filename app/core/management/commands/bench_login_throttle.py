@@ -0,0 +1,160 @@
+"""
+Django command to load test logins during a credential stuffing attack.
+"""
+import logging
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+PASSWORD = 'benchpass123'
+EMAIL_DOMAIN = 'bench-login.example.com'
+
+
+class Attacker(threading.Thread):
+    """Post wrong passwords for many emails from one IP until stopped.
+
+    Attempts are sent every `interval` seconds, or back to back once the
+    server answers slower than that.
+    """
+
+    def __init__(self, ip, interval, stop):
+        super().__init__(daemon=True)
+        self.ip = ip
+        self.interval = interval
+        self.stop = stop
+        self.sent = 0
+        self.throttled = 0
+
+    def run(self):
+        client = Client(HTTP_HOST='localhost', REMOTE_ADDR=self.ip)
+        next_at = time.monotonic()
+        try:
+            while not self.stop.wait(max(next_at - time.monotonic(), 0)):
+                next_at += self.interval
+                res = client.post(reverse('user:token'), {
+                    'email': f'victim{self.sent}@{EMAIL_DOMAIN}',
+                    'password': 'guess',
+                })
+                self.sent += 1
+                self.throttled += res.status_code == 429
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    """Django command to time legitimate logins with and without attack."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+        parser.add_argument('--attackers', type=int, default=8)
+        parser.add_argument(
+            '--attack-rate', type=float, default=50,
+            help='Attempts per second offered by all attackers together.',
+        )
+        parser.add_argument(
+            '--attacker-ips', type=int, default=2,
+            help='Client IPs the attacking threads share.',
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=60.0,
+            help='Longest wait for every attacker to be throttled.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Creating users....')
+        User = get_user_model()
+        User.objects.filter(email__endswith=EMAIL_DOMAIN).delete()
+        # Hash once, each scenario logs in a fresh set of users.
+        template = User()
+        template.set_password(PASSWORD)
+        User.objects.bulk_create(
+            User(email=f'user{i}@{EMAIL_DOMAIN}', password=template.password)
+            for i in range(options['logins'] * 3)
+        )
+
+        # Each rejected attempt is logged as a warning.
+        logger = logging.getLogger('django.request')
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+        try:
+            scenarios = [
+                ('no attack', 0, None),
+                ('attack, throttled', options['attackers'], None),
+                ('attack, unthrottled', options['attackers'], {}),
+            ]
+            for index, (label, attackers, rates) in enumerate(scenarios):
+                users = range(
+                    index * options['logins'], (index + 1) * options['logins']
+                )
+                self._run(label, users, attackers, rates, options)
+        finally:
+            logger.setLevel(level)
+            User.objects.filter(email__endswith=EMAIL_DOMAIN).delete()
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
+
+    def _run(self, label, users, attackers, rates, options):
+        """Time logins of `users` while `attackers` threads attack."""
+        caches['throttle'].clear()
+        settings = {}
+        if rates is not None:
+            settings['REST_FRAMEWORK'] = {'DEFAULT_THROTTLE_RATES': rates}
+
+        with override_settings(**settings):
+            stop = threading.Event()
+            threads = [
+                Attacker(
+                    f'10.66.0.{n % options["attacker_ips"]}',
+                    attackers / options['attack_rate'],
+                    stop,
+                )
+                for n in range(attackers)
+            ]
+            for thread in threads:
+                thread.start()
+            # Time the attack once the throttles hold it back, not
+            # while attackers spend their first window's attempts.
+            deadline = time.monotonic() + (
+                options['warmup'] if rates is None else 1
+            )
+            while threads and time.monotonic() < deadline and not all(
+                thread.throttled for thread in threads
+            ):
+                time.sleep(0.1)
+
+            latencies = []
+            failed = 0
+            for i in users:
+                client = Client(
+                    HTTP_HOST='localhost',
+                    REMOTE_ADDR=f'10.1.{i // 250}.{i % 250}',
+                )
+                start = time.perf_counter()
+                res = client.post(reverse('user:token'), {
+                    'email': f'user{i}@{EMAIL_DOMAIN}',
+                    'password': PASSWORD,
+                })
+                latencies.append((time.perf_counter() - start) * 1000)
+                failed += res.status_code != 200
+
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        latencies.sort()
+        sent = sum(thread.sent for thread in threads)
+        throttled = sum(thread.throttled for thread in threads)
+        self.stdout.write(
+            f'{label}: login p50 {statistics.median(latencies):.0f} ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.0f} ms, '
+            f'max {latencies[-1]:.0f} ms, {failed} failed; '
+            f'{sent} attack requests, {throttled} throttled'
+        )
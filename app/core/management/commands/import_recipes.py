@@ -0,0 +1,207 @@
+"""
+Django command to bulk import recipes from an NDJSON or CSV file.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.models import ImportProgress
+from recipe.bulk import RELATED_MODELS, bulk_save_recipes
+from recipe.export import NAME_SEPARATOR
+from recipe.serializers import RecipeBatchItemSerializer
+
+FORMATS = ('ndjson', 'csv')
+
+
+def read_records(path, file_format):
+    """Yield the raw records of the file, one at a time.
+
+    NDJSON records are yielded as unparsed lines, so records belonging
+    to other workers or already imported are skipped cheaply.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield line
+
+
+def parse_record(record, file_format):
+    """Return the recipe data of a raw record.
+
+    Tags and ingredients may be given as objects with a name, as plain
+    names, or in CSV as names joined with the export separator.
+    """
+    if file_format == 'csv':
+        data = {key: value for key, value in record.items() if value}
+        for field in RELATED_MODELS:
+            names = data.get(field, '').split(NAME_SEPARATOR)
+            data[field] = [name.strip() for name in names if name.strip()]
+    else:
+        data = json.loads(record)
+        if not isinstance(data, dict):
+            raise ValueError('Expected a recipe object.')
+
+    data.pop('id', None)
+    data.pop('image', None)
+    for field in RELATED_MODELS:
+        data[field] = [
+            {'name': item} if isinstance(item, str) else item
+            for item in data.get(field) or []
+        ]
+    return data
+
+
+def import_partition(options, worker=0, report=print):
+    """Import the batches of the file owned by `worker`.
+
+    Batches are numbered in file order and worker n owns every batch
+    where number % workers == n. Progress is saved in the transaction
+    of each batch, so a rerun resumes after the last committed one.
+    Returns the (imported, skipped) totals of the partition.
+    """
+    user = get_user_model().objects.get(email=options['email'])
+    batch_size = options['batch_size']
+    workers = options['workers']
+    file_format = options['format']
+    progress, _ = ImportProgress.objects.get_or_create(
+        checkpoint=options['checkpoint'],
+        worker=worker,
+        defaults={'batch_size': batch_size, 'workers': workers},
+    )
+    prefix = f'[worker {worker}] ' if workers > 1 else ''
+    started = time.monotonic()
+    imported_now = 0
+
+    def flush(batch, position):
+        nonlocal imported_now
+        creates = []
+        for index, record in batch:
+            try:
+                serializer = RecipeBatchItemSerializer(
+                    data=parse_record(record, file_format)
+                )
+                if serializer.is_valid():
+                    creates.append(serializer.validated_data)
+                    continue
+                errors = serializer.errors
+            except ValueError as exc:
+                errors = str(exc)
+            progress.skipped += 1
+            report(f'{prefix}Skipped record {index + 1}: {errors}')
+
+        with transaction.atomic():
+            bulk_save_recipes(user, creates, [])
+            progress.imported += len(creates)
+            progress.position = position
+            progress.save(update_fields=['position', 'imported', 'skipped'])
+
+        imported_now += len(creates)
+        rate = imported_now / max(time.monotonic() - started, 1e-9)
+        report(
+            f'{prefix}Imported {progress.imported} recipes, '
+            f'skipped {progress.skipped} ({rate:.0f} recipes/s)'
+        )
+
+    batch = []
+    for index, record in enumerate(read_records(options['path'], file_format)):
+        if index < progress.position:
+            continue
+        if (index // batch_size) % workers != worker:
+            continue
+        batch.append((index, record))
+        if len(batch) == batch_size:
+            flush(batch, index + 1)
+            batch = []
+    if batch:
+        flush(batch, batch[-1][0] + 1)
+
+    return progress.imported, progress.skipped
+
+
+def _run_worker(options, worker):
+    """Import one partition in a worker process."""
+    django.setup()
+    return import_partition(options, worker)
+
+
+class Command(BaseCommand):
+    """Django command to import recipes in batches."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True,
+                            help='Owner of the imported recipes.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Input format, by default from the '
+                                 'file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--checkpoint',
+                            help='Name the progress is saved under, by '
+                                 'default the absolute input path.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['format'] is None:
+            extension = os.path.splitext(options['path'])[1].lstrip('.')
+            if extension not in FORMATS:
+                raise CommandError('Pass --format, the file extension is '
+                                   f'not one of {", ".join(FORMATS)}.')
+            options['format'] = extension
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be '
+                               'at least 1.')
+        if not get_user_model().objects.filter(
+            email=options['email']
+        ).exists():
+            raise CommandError(f'No user with email {options["email"]}.')
+        options['checkpoint'] = (
+            options['checkpoint'] or os.path.abspath(options['path'])
+        )
+        # Which records a worker owns depends on both options.
+        if ImportProgress.objects.filter(
+            checkpoint=options['checkpoint']
+        ).exclude(
+            batch_size=options['batch_size'], workers=options['workers']
+        ).exists():
+            raise CommandError(
+                'The checkpoint was saved with another --batch-size or '
+                '--workers. Resume with the same values, or pass a new '
+                '--checkpoint to start over.'
+            )
+        options = {
+            key: options[key] for key in (
+                'path', 'email', 'format', 'batch_size', 'workers',
+                'checkpoint',
+            )
+        }
+
+        self.stdout.write('Importing recipes....')
+        if options['workers'] == 1:
+            totals = [import_partition(options, report=self.stdout.write)]
+        else:
+            # Forked workers must not share the parent's connections.
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers']) as pool:
+                totals = list(pool.map(
+                    _run_worker,
+                    [options] * options['workers'],
+                    range(options['workers']),
+                ))
+
+        imported = sum(count for count, _ in totals)
+        skipped = sum(count for _, count in totals)
+        self.stdout.write(self.style.SUCCESS(
+            f'Import complete! {imported} recipes imported, '
+            f'{skipped} skipped.'
+        ))
@@ -1,28 +1,166 @@
 """
 Django command to wait for database to be available.
 """
-
+import json
+import os
+import random
+import tempfile
+import threading
 import time
+from concurrent.futures import FIRST_EXCEPTION, Future, wait
 
-from psycopg2 import OperationalError as Psycopg2Error
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
 
 class Command(BaseCommand):
     """Django command to wait for database"""
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Alias to wait for, repeatable. Defaults to every alias.',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before failing, 0 waits forever.',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.01,
+            help='Seconds before the first retry, doubled on each retry.',
+        )
+        parser.add_argument('--max-delay', type=float, default=2)
+        parser.add_argument(
+            '--migrations', action='store_true',
+            help='Also wait until every migration is applied.',
+        )
+        parser.add_argument(
+            '--ready-file',
+            help='File written once every database is ready, for probes.',
+        )
+
+    def check(self, *args, databases=None, **kwargs):
+        """Run the system checks, then connect to each database.
+
+        The database checks alone do not always open a connection.
+        """
+        super().check(*args, databases=databases, **kwargs)
+        for alias in databases or []:
+            connections[alias].ensure_connection()
+
+    def _pending_migrations(self, alias):
+        """Return the migrations not yet applied to a database."""
+        executor = MigrationExecutor(connections[alias])
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    def _wait_for(self, alias, deadline, options):
+        """Retry one database with jittered backoff until it is ready.
+
+        Return whether it became ready before the deadline.
+        """
+        backoff = options['initial_delay']
+        try:
+            while True:
+                try:
+                    self.check(databases=[alias])
+                    pending = (
+                        options['migrations']
+                        and self._pending_migrations(alias)
+                    )
+                    if not pending:
+                        return True
+                    reason = f'{len(pending)} migrations pending'
+                except OperationalError:
+                    reason = 'unavailable'
+
+                # Full jitter keeps restarting workers from retrying in step.
+                delay = random.uniform(0, backoff)
+                backoff = min(backoff * 2, options['max_delay'])
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    delay = min(delay, remaining)
+                self.stdout.write(
+                    f'Database {alias!r} {reason}, '
+                    f'retrying in {delay * 1000:.0f} ms...'
+                )
+                time.sleep(delay)
+        finally:
+            connections[alias].close()
+
+    def _start(self, alias, deadline, options):
+        """Wait for a database in a daemon thread, returning a future.
+
+        A connection attempt can hang past the deadline, and executor
+        threads would keep the process alive until it returns.
+        """
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._wait_for(alias, deadline, options))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def _write_ready_file(self, path, aliases, elapsed):
+        """Atomically write the readiness marker."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.ready-')
+        with os.fdopen(fd, 'w') as marker:
+            json.dump({
+                'databases': aliases,
+                'waited_seconds': round(elapsed, 3),
+                'ready_at': time.time(),
+            }, marker)
+        os.replace(tmp, path)
+
     def handle(self, *args, **options):
         """Entrypoint for command."""
+        ready_file = options['ready_file']
+        if ready_file and os.path.exists(ready_file):
+            # Probes must not see readiness from an earlier run.
+            os.remove(ready_file)
+
+        aliases = options['databases'] or list(connections)
+        start = time.monotonic()
+        deadline = start + options['timeout'] if options['timeout'] else None
+
         self.stdout.write('Waiting for database....')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except(Psycopg2Error,OperationalError):
-                self.stdout.write('Database unavailable, waiting for 1 second...')
-                time.sleep(1)
-                        
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        futures = {
+            self._start(alias, deadline, options): alias for alias in aliases
+        }
+        # Stop at the first error rather than waiting out the deadline.
+        done, _ = wait(
+            futures,
+            None if deadline is None else max(deadline - time.monotonic(), 0),
+            return_when=FIRST_EXCEPTION,
+        )
+        for future in done:
+            if future.exception() is not None:
+                raise CommandError(
+                    f'Waiting for {futures[future]!r} failed: '
+                    f'{future.exception()!r}'
+                ) from future.exception()
 
+        waiting = [
+            alias for future, alias in futures.items()
+            if future not in done or not future.result()
+        ]
+        if waiting:
+            raise CommandError(
+                f'Databases not ready after {options["timeout"]:g} s: '
+                f'{", ".join(waiting)}'
+            )
+
+        if ready_file:
+            self._write_ready_file(
+                ready_file, aliases, time.monotonic() - start
+            )
+        self.stdout.write(self.style.SUCCESS('Database available!'))
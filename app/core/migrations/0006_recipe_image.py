@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:35
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ingredient_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:44
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name for the same user."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field in ('tags', 'ingredients'):
+        m2m = Recipe._meta.get_field(field)
+        model = m2m.related_model
+        through = m2m.remote_field.through
+        target = m2m.m2m_reverse_field_name()
+
+        duplicates = model.objects.values('user', 'name').annotate(
+            rows=Count('id'),
+            keep=Min('id'),
+        ).filter(rows__gt=1)
+        for group in duplicates:
+            extra = model.objects.filter(
+                user=group['user'],
+                name=group['name'],
+            ).exclude(id=group['keep'])
+            for obj_id in extra.values_list('id', flat=True):
+                linked = through.objects.filter(
+                    **{f'{target}_id': group['keep']}
+                ).values('recipe_id')
+                through.objects.filter(
+                    **{f'{target}_id': obj_id, 'recipe_id__in': linked}
+                ).delete()
+                through.objects.filter(**{f'{target}_id': obj_id}).update(
+                    **{f'{target}_id': group['keep']}
+                )
+            extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    """Maintain and index the search vector on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE FUNCTION core_recipe_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER core_recipe_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+        FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_update();
+    """)
+    schema_editor.execute(
+        f"UPDATE core_recipe SET search_vector = "
+        f"{SEARCH_VECTOR_SQL.format(row='')};"
+    )
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_idx '
+        'ON core_recipe USING gin (search_vector);'
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    """Remove the PostgreSQL search vector trigger and index."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_recipe_search_vector_idx;')
+    schema_editor.execute(
+        'DROP TRIGGER core_recipe_search_vector_trigger ON core_recipe;'
+    )
+    schema_editor.execute('DROP FUNCTION core_recipe_search_vector_update();')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
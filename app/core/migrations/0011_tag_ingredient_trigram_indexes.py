@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:40
+
+from django.contrib.postgres.operations import (
+    BtreeGinExtension,
+    TrigramExtension,
+)
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Index names per user for prefix and fuzzy matching on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_name_trgm_idx ON {table} '
+            f'USING gin (user_id, name gin_trgm_ops);'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Remove the PostgreSQL trigram indexes."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP INDEX {table}_user_name_trgm_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:07
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_references(apps, schema_editor):
+    """Record how many recipes use each already stored image."""
+    Recipe = apps.get_model('core', 'Recipe')
+    StoredImage = apps.get_model('core', 'StoredImage')
+    references = Recipe.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).values('image').annotate(refs=Count('id'))
+    StoredImage.objects.bulk_create([
+        StoredImage(name=row['image'], ref_count=row['refs'])
+        for row in references
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.image_storage, upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(
+            count_image_references, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Derivative layout when this migration was written; kept here so later
+# changes to recipe.images cannot alter what the migration checks.
+DERIVATIVE_SIZES = (1024, 512, 128)
+DERIVATIVE_EXTENSIONS = ('webp', 'jpeg')
+
+
+def derivative_names(name):
+    """Return the storage names of every derivative of `name`."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return [
+        os.path.join(directory, 'derivatives', stem, f'{size}.{extension}')
+        for size in DERIVATIVE_SIZES
+        for extension in DERIVATIVE_EXTENSIONS
+    ]
+
+
+def mark_generated_derivatives(apps, schema_editor):
+    """Mark stored images whose derivatives are already on disk."""
+    StoredImage = apps.get_model('core', 'StoredImage')
+    ready = [
+        stored.pk for stored in StoredImage.objects.iterator()
+        if all(
+            default_storage.exists(target)
+            for target in derivative_names(stored.name)
+        )
+    ]
+    StoredImage.objects.filter(pk__in=ready).update(derivatives_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_import_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedimage',
+            name='derivatives_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(
+            mark_generated_derivatives, migrations.RunPython.noop
+        ),
+    ]
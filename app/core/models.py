@@ -5,12 +5,18 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser , PermissionsMixin , BaseUserManager
 
+from core.storage import image_storage
+
 
 def recipe_image_file_path(instance,filename):
-    """Generate file path for new recipe image."""
+    """Generate file path for new recipe image.
+
+    The image storage replaces the file name with the content hash.
+    """
     ext = os.path.splitext(filename)[1]
     filename = f'{uuid.uuid4()}{ext}'
 
@@ -47,11 +53,33 @@ class User(AbstractBaseUser,PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped to revoke every signed token issued to the user.
+    token_epoch = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    def save(self, *args, **kwargs):
+        """Save the user, leaving token_epoch to queryset updates.
+
+        A stale instance would otherwise write back an older epoch and
+        accept the tokens it revoked again.
+        """
+        if (
+            kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'token_epoch'
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     """Recipe Objects."""
@@ -63,7 +91,34 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255,blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
-    image = models.ImageField(null=True,upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=image_storage,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger on PostgreSQL, unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='recipe_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='recipe_user_updated_at_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='recipe_user_time_minutes_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='recipe_user_price_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +128,14 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -81,5 +144,52 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class StoredImage(models.Model):
+    """Number of recipes referencing a stored image file.
+
+    Also records once every resized derivative of the image is stored.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    derivatives_ready = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.name
+
+
+class ImportProgress(models.Model):
+    """Progress of one worker of a resumable recipe import.
+
+    Saved in the transaction of each imported batch, with the options
+    deciding which records belong to the worker.
+    """
+    checkpoint = models.CharField(max_length=255)
+    worker = models.PositiveIntegerField()
+    batch_size = models.PositiveIntegerField()
+    workers = models.PositiveIntegerField()
+    position = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['checkpoint', 'worker'],
+                name='unique_import_progress_worker',
+            ),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f'{self.checkpoint} [worker {self.worker}]'
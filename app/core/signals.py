@@ -0,0 +1,64 @@
+"""
+Signal handlers dropping cached authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token, invalidate_token_epoch
+
+# Changes to these user fields revoke the user's signed tokens.
+REVOKING_FIELDS = ('password', 'is_active')
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the cache."""
+    invalidate_token(instance.key)
+
+
+@receiver(pre_save, sender=get_user_model())
+def detect_revoking_change(sender, instance, update_fields=None, **kwargs):
+    """Note whether a save changes the password or active flag."""
+    instance._revoke_tokens = False
+    if instance._state.adding:
+        return
+    fields = [
+        name for name in REVOKING_FIELDS
+        if name not in instance.get_deferred_fields()
+        and (update_fields is None or name in update_fields)
+    ]
+    if not fields:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._revoke_tokens = stored is not None and any(
+        stored[name] != getattr(instance, name) for name in fields
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def bump_token_epoch(sender, instance, **kwargs):
+    """Revoke the signed tokens of a user after a revoking change."""
+    if getattr(instance, '_revoke_tokens', False):
+        sender.objects.filter(pk=instance.pk).update(
+            token_epoch=F('token_epoch') + 1
+        )
+        instance.refresh_from_db(fields=['token_epoch'])
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop cached tokens and token epoch of a changed user.
+
+    This covers deactivation and password changes, and keeps the cached
+    user from going stale after profile updates.
+    """
+    invalidate_token_epoch(instance.pk)
+    for key in Token.objects.filter(user_id=instance.pk).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
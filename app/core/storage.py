@@ -0,0 +1,100 @@
+"""
+Content addressed file storage.
+"""
+import contextlib
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store files under the SHA-256 of their content.
+
+    The directory of the requested name is kept, and the file goes in
+    two levels of shards from the hash prefix, such as
+    `uploads/recipe/ab/cd/abcd...ef.jpg`. Saving content that is
+    already stored writes nothing and returns the existing name.
+    """
+    incoming_dir = '.incoming'
+
+    def hashed_name(self, directory, digest, extension):
+        """Return the sharded name of content with the given hash."""
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def lock(self, name):
+        """Return a context manager held while `name` is checked and stored.
+
+        Does nothing by default.
+        """
+        return contextlib.nullcontext()
+
+    def get_available_name(self, name, max_length=None):
+        # Names come from the content, so an existing name is a match.
+        return name
+
+    def _save(self, name, content):
+        """Hash the content while streaming it to a temporary file.
+
+        The file is then moved into place, or dropped if identical
+        content is already stored.
+        """
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        incoming = self.path(self.incoming_dir)
+        os.makedirs(incoming, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=incoming, suffix=extension)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+
+            name = self.hashed_name(directory, digest.hexdigest(), extension)
+            full_path = self.path(name)
+            with self.lock(name):
+                if os.path.exists(full_path):
+                    os.remove(tmp_path)
+                    return name
+
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+class ImageStorage(ContentAddressedStorage):
+    """Content addressed storage of reference counted recipe images.
+
+    Saving locks the StoredImage row of the image, creating it if
+    needed, until the transaction ends. Files of unreferenced images are
+    only deleted under the same lock, so save in the transaction that
+    counts the new reference: a stored file found by the save cannot be
+    deleted before then.
+    """
+
+    @contextlib.contextmanager
+    def lock(self, name):
+        from core.models import StoredImage
+
+        with transaction.atomic():
+            StoredImage.objects.select_for_update().get_or_create(name=name)
+            yield
+
+
+def image_storage():
+    """Return the storage for recipe images."""
+    return ImageStorage()
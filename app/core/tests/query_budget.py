@@ -0,0 +1,32 @@
+"""
+Query budget helpers for API tests.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Fail a test when a viewset action goes over its query budget.
+
+    Viewsets declare their budget as a ``query_budget`` dict mapping
+    the action name to the maximum number of queries it may run.
+    """
+
+    def assertWithinQueryBudget(self, viewset, action, method, *args,
+                                **kwargs):
+        """Call the API and check the query count against the budget."""
+        budget = viewset.query_budget[action]
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method)(*args, **kwargs)
+
+        if len(ctx.captured_queries) > budget:
+            queries = '\n'.join(
+                q['sql'] for q in ctx.captured_queries
+            )
+            self.fail(
+                f'{viewset.__name__}.{action} ran '
+                f'{len(ctx.captured_queries)} queries, budget is {budget}:'
+                f'\n{queries}'
+            )
+
+        return res
@@ -0,0 +1,310 @@
+"""
+Tests for the cached token authentication.
+"""
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    issue_signed_tokens,
+    local_epochs,
+    local_tokens,
+    token_cache_key,
+)
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class SharedAuthCacheMixin:
+    """Back the `auth` cache with files, shared between processes."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared = override_settings(CACHES={
+            **settings.CACHES,
+            'auth': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': tmpdir.name,
+            },
+        })
+        shared.enable()
+        self.addCleanup(shared.disable)
+        super().setUp()
+
+
+class CachedTokenAuthenticationTests(SharedAuthCacheMixin, TestCase):
+    """Test authenticating tokens through the cache."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _token_queries(self):
+        """Request the profile and return the token lookups it ran."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+        self.last_response = res
+        return [q for q in ctx.captured_queries if 'authtoken' in q['sql']]
+
+    def test_token_cached_after_first_request(self):
+        """Test only the first request looks the token up."""
+        self.assertEqual(len(self._token_queries()), 1)
+        self.assertEqual(len(self._token_queries()), 0)
+        self.assertEqual(self.last_response.data['name'], 'Test Name')
+
+    def test_shared_cache_used_when_local_entry_missing(self):
+        """Test another process finds the token in the shared cache."""
+        self._token_queries()
+        local_tokens.clear()
+
+        self.assertEqual(len(self._token_queries()), 0)
+
+    @override_settings(AUTH_TOKEN_LOCAL_CACHE_TTL=-1)
+    def test_local_entries_expire(self):
+        """Test expired local entries fall back to the shared cache."""
+        self._token_queries()
+        caches['auth'].delete(token_cache_key(self.token.key))
+
+        self.assertEqual(len(self._token_queries()), 1)
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working at once."""
+        self._token_queries()
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test tokens of a deactivated user stop working at once."""
+        self._token_queries()
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_drops_cached_user(self):
+        """Test changing the password looks the token up again."""
+        self._token_queries()
+
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(len(self._token_queries()), 1)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpassword123'))
+
+    def test_requests_get_their_own_user(self):
+        """Test changes to request.user do not leak into the cache."""
+        self._token_queries()
+        user = local_tokens.get(self.token.key)
+
+        self.client.patch(ME_URL, {'name': 'Changed'})
+
+        self.assertEqual(user.name, 'Test Name')
+        self.assertEqual(self.client.get(ME_URL).data['name'], 'Changed')
+
+
+class ProcessLocalAuthCacheTests(TestCase):
+    """Test a per-process `auth` cache is not relied on."""
+
+    def setUp(self):
+        local_tokens.clear()
+        local_epochs.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_not_kept_in_process_cache(self):
+        """Test another worker looks the token up once its entry expires.
+
+        The user is deactivated without signals, as in another process.
+        """
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        local_tokens.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(caches['auth'].get(token_cache_key(self.token.key)))
+
+    def test_epoch_not_kept_in_process_cache(self):
+        """Test another worker reads a new epoch once its entry expires."""
+        tokens = issue_signed_tokens(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}'
+        )
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            token_epoch=F('token_epoch') + 1
+        )
+        local_epochs.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE_TIMEOUT=0)
+class SignedTokenAuthenticationTests(SharedAuthCacheMixin, TestCase):
+    """Test authenticating signed access tokens."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        local_epochs.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.tokens = issue_signed_tokens(self.user)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}'
+        )
+
+    def test_access_token_checked_in_memory(self):
+        """Test a known epoch needs no user or token query."""
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('core_user', ctx.captured_queries[0]['sql'])
+
+    def test_user_loaded_on_access(self):
+        """Test views reading the profile get the full user."""
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['email'], 'user@example.com')
+        self.assertEqual(res.data['name'], 'Test Name')
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a changed payload is rejected."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        forged = issue_signed_tokens(other)['access'].split(':')[0]
+        signature = self.tokens['access'].split(':', 1)[1]
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {forged}:{signature}'
+        )
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_accepted_as_access(self):
+        """Test refresh tokens cannot authenticate requests."""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.tokens["refresh"]}'
+        )
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_ACCESS_TOKEN_LIFETIME=-1)
+    def test_expired_token_rejected(self):
+        """Test access tokens expire."""
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Bearer')
+
+    def test_password_change_revokes_tokens(self):
+        """Test changing the password revokes issued tokens."""
+        self.client.get(TAGS_URL)
+
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_epoch, 1)
+
+    def test_deactivation_revokes_tokens(self):
+        """Test deactivating a user revokes issued tokens."""
+        self.client.get(TAGS_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_save_keeps_epoch(self):
+        """Test saving a stale user does not roll the epoch back."""
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            token_epoch=F('token_epoch') + 1
+        )
+
+        stale.name = 'Changed'
+        stale.save()
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.token_epoch, 1)
+        self.assertEqual(stale.name, 'Changed')
+
+    def test_login_save_skips_revocation_check(self):
+        """Test saves of other fields do not read the stored user."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.save(update_fields=['last_login'])
+
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and 'core_user' in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    def test_profile_change_keeps_tokens(self):
+        """Test other profile changes leave tokens valid."""
+        self.client.patch(ME_URL, {'name': 'Changed'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
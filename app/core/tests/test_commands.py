@@ -1,13 +1,23 @@
 """
 Test custom Django management commands.
 """
-from unittest.mock import patch
-
-from psycopg2 import OperationalError as Psycopg2Error
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf
+from unittest.mock import Mock, patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core.management.commands.import_recipes import import_partition
+from core.models import ImportProgress, Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -25,10 +35,298 @@ class CommandTest(SimpleTestCase):
     @patch('time.sleep')
     def test_for_db_delay(self,patched_sleep,patched_check):
         """Test waiting for database when getting OperationalError."""
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
-        
+        patched_check.side_effect = [OperationalError] * 5 + [True]
+
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count,6)
         patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_check):
+        """Test retries back off exponentially with jitter."""
+        patched_check.side_effect = [OperationalError] * 8 + [True]
+
+        call_command(
+            'wait_for_db', '--initial-delay', '0.01', '--max-delay', '0.5',
+            stdout=StringIO(),
+        )
+
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 8)
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, min(0.5, 0.01 * 2 ** attempt))
+
+    @patch('core.management.commands.wait_for_db.connections',
+           {'default': Mock(), 'replica': Mock()})
+    def test_wait_for_every_alias(self, patched_check):
+        """Test every configured database is checked."""
+        call_command('wait_for_db', stdout=StringIO())
+
+        patched_check.assert_any_call(databases=['default'])
+        patched_check.assert_any_call(databases=['replica'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_check):
+        """Test failing once the deadline passes."""
+        patched_check.side_effect = OperationalError
+
+        with self.assertRaisesRegex(CommandError, 'default'):
+            call_command('wait_for_db', '--timeout', '0.05', stdout=StringIO())
+
+    def test_ready_file(self, patched_check):
+        """Test the readiness marker is written when ready."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ready')
+
+            call_command(
+                'wait_for_db', '--ready-file', path, stdout=StringIO()
+            )
+
+            with open(path) as marker:
+                self.assertEqual(json.load(marker)['databases'], ['default'])
+
+    @patch('time.sleep')
+    def test_stale_ready_file_removed(self, patched_sleep, patched_check):
+        """Test a marker from an earlier run is removed on failure."""
+        patched_check.side_effect = OperationalError
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ready')
+            open(path, 'w').close()
+
+            with self.assertRaises(CommandError):
+                call_command(
+                    'wait_for_db', '--timeout', '0.05', '--ready-file', path,
+                    stdout=StringIO(),
+                )
+
+            self.assertFalse(os.path.exists(path))
+
+    @patch('time.sleep')
+    def test_backoff_capped_after_many_retries(
+        self, patched_sleep, patched_check
+    ):
+        """Test long outages keep retrying at the maximum delay."""
+        patched_check.side_effect = [OperationalError] * 2000 + [True]
+
+        call_command(
+            'wait_for_db', '--timeout', '0', '--max-delay', '0.5',
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(patched_check.call_count, 2001)
+        self.assertLessEqual(patched_sleep.call_args.args[0], 0.5)
+
+    def test_unexpected_error_fails_fast(self, patched_check):
+        """Test an error other than unavailability fails immediately."""
+        patched_check.side_effect = RuntimeError('bad settings')
+
+        with self.assertRaisesRegex(CommandError, 'bad settings'):
+            call_command('wait_for_db', '--timeout', '0', stdout=StringIO())
+
+
+class WaitForMigrationsTests(TestCase):
+    """Test waiting for migrations to be applied."""
+
+    def test_migrated_database_ready(self):
+        """Test a fully migrated database is ready."""
+        out = StringIO()
+
+        call_command('wait_for_db', '--migrations', stdout=out)
+
+        self.assertIn('Database available!', out.getvalue())
+
+    @patch('time.sleep')
+    @patch('core.management.commands.wait_for_db.Command._pending_migrations')
+    def test_waits_for_pending_migrations(
+        self, patched_pending, patched_sleep
+    ):
+        """Test waiting while migrations are pending."""
+        patched_pending.side_effect = [['0015_pending']] * 2 + [[]]
+        out = StringIO()
+
+        call_command('wait_for_db', '--migrations', stdout=out)
+
+        self.assertEqual(patched_pending.call_count, 3)
+        self.assertIn('1 migrations pending', out.getvalue())
+
+
+class ImportRecipesTests(TestCase):
+    """Test the bulk recipe import command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        """Write an input file and return its path."""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def _import(self, path, **options):
+        """Run the import command and return its output."""
+        out = StringIO()
+        call_command(
+            'import_recipes', path, email=self.user.email,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test importing recipes with tags and ingredients from NDJSON."""
+        lines = [
+            {'title': 'Curry', 'time_minutes': 30, 'price': '5.50',
+             'tags': [{'id': 99, 'name': 'Vegan'}],
+             'ingredients': ['Rice', 'Lentils']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': '2.00',
+             'tags': ['Vegan']},
+        ]
+        path = self._write(
+            'recipes.ndjson', '\n'.join(json.dumps(line) for line in lines)
+        )
+
+        output = self._import(path, batch_size=1)
+
+        self.assertIn('2 recipes imported, 0 skipped', output)
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.price, Decimal('5.50'))
+        self.assertEqual(
+            sorted(curry.ingredients.values_list('name', flat=True)),
+            ['Lentils', 'Rice'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Tag.objects.get().recipe_set.count(), 2)
+
+    def test_import_csv_skips_invalid_rows(self):
+        """Test importing CSV reports and skips invalid rows."""
+        path = self._write('recipes.csv', (
+            'title,time_minutes,price,tags,ingredients\n'
+            'Curry,30,5.50,Vegan;Dinner,Rice\n'
+            'Broken,soon,1.00,,\n'
+        ))
+
+        output = self._import(path)
+
+        self.assertIn('Skipped record 2', output)
+        self.assertIn('1 recipes imported, 1 skipped', output)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Dinner', 'Vegan'],
+        )
+
+    def _write_recipes(self, count):
+        """Write an NDJSON file of `count` recipes and return its path."""
+        return self._write('recipes.ndjson', '\n'.join(
+            json.dumps({'title': f'Recipe {i}', 'time_minutes': 5,
+                        'price': '1.00'})
+            for i in range(count)
+        ))
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test a rerun only imports records after the checkpoint."""
+        path = self._write_recipes(5)
+        ImportProgress.objects.create(
+            checkpoint=path, worker=0, batch_size=2, workers=1,
+            position=3, imported=3,
+        )
+
+        output = self._import(path, batch_size=2)
+
+        self.assertIn('5 recipes imported', output)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Recipe 3', 'Recipe 4'],
+        )
+        self._import(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_resume_with_other_options_refused(self):
+        """Test resuming with another batch size or worker count fails."""
+        path = self._write_recipes(5)
+        self._import(path, batch_size=2)
+
+        for options in ({'batch_size': 3}, {'batch_size': 2, 'workers': 2}):
+            with self.assertRaisesRegex(CommandError, '--batch-size'):
+                self._import(path, **options)
+
+        self._import(path, batch_size=3, checkpoint='again')
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_progress_saved_with_batch(self):
+        """Test a batch and its progress are committed together."""
+        path = self._write_recipes(3)
+
+        with patch.object(ImportProgress, 'save', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self._import(path)
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_partitions_split_batches_across_workers(self):
+        """Test every record belongs to exactly one worker."""
+        path = self._write_recipes(7)
+        options = {
+            'path': path, 'email': self.user.email, 'format': 'ndjson',
+            'batch_size': 2, 'workers': 2, 'checkpoint': path,
+        }
+
+        totals = [
+            import_partition(options, worker, report=lambda msg: None)
+            for worker in range(2)
+        ]
+
+        self.assertEqual(totals, [(4, 0), (3, 0)])
+        self.assertEqual(Recipe.objects.count(), 7)
+
+    def test_import_unknown_user(self):
+        """Test importing for an unknown email fails."""
+        path = self._write('recipes.ndjson', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, email='nobody@example.com')
+
+
+@skipIf(
+    connection.vendor == 'sqlite',
+    'Worker processes need a database server to share the test data.',
+)
+class ImportRecipesWorkersTests(TransactionTestCase):
+    """Test importing with a pool of worker processes."""
+
+    def test_import_with_workers(self):
+        """Test every record is imported once across worker processes."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'recipes.ndjson')
+            with open(path, 'w') as file:
+                file.write('\n'.join(
+                    json.dumps({'title': f'Recipe {i}', 'time_minutes': 5,
+                                'price': '1.00'})
+                    for i in range(7)
+                ))
+
+            out = StringIO()
+            call_command(
+                'import_recipes', path, email=user.email, batch_size=2,
+                workers=3, stdout=out,
+            )
+
+        self.assertIn('7 recipes imported, 0 skipped', out.getvalue())
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            [f'Recipe {i}' for i in range(7)],
+        )
+        self.assertEqual(
+            ImportProgress.objects.filter(checkpoint=path).count(), 3
+        )
@@ -0,0 +1,70 @@
+"""
+Tests for the database connection statistics.
+"""
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.database import connection_stats
+
+STATS_URL = reverse('database-stats')
+
+
+class ConnectionStatsTests(TestCase):
+    """Test reporting connection statistics."""
+
+    def test_connections_counted(self):
+        """Test unpooled aliases count the connections opened."""
+        opened = connection_stats()['default']['connections_opened']
+
+        connection_created.send(sender=type(connection), connection=connection)
+
+        stats = connection_stats()['default']
+        self.assertFalse(stats['pooled'])
+        self.assertEqual(stats['connections_opened'], opened + 1)
+
+    def test_pool_stats(self):
+        """Test pooled aliases report the pool counters."""
+        pool = Mock()
+        pool.get_stats.return_value = {
+            'pool_max': 10,
+            'requests_num': 7,
+            'requests_queued': 2,
+            'requests_errors': 1,
+        }
+
+        wrapper = type(connections['default'])
+        with patch.object(wrapper, 'pool', pool, create=True):
+            stats = connection_stats()['default']
+
+        self.assertTrue(stats['pooled'])
+        self.assertEqual(stats['max_size'], 10)
+        self.assertEqual(stats['checkouts'], 7)
+        self.assertEqual(stats['waits'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['available'], 0)
+
+    def test_stats_require_staff(self):
+        """Test only staff users can read the statistics."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        res = client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('default', res.data)
@@ -4,6 +4,7 @@ Tests for modules.
 from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -86,6 +87,14 @@ class ModelTets(TestCase):
 
         self.assertEqual(str(tag),tag.name)
     
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Tag1')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='Tag1')
+
     def test_create_ingredient(self):
         """Test creating ingredients successful."""
         user = create_user()
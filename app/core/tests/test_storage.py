@@ -0,0 +1,46 @@
+"""
+Tests for the content addressed storage.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test storing files under their content hash."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def test_name_sharded_by_hash(self):
+        """Test files are named after their hash in prefix shards."""
+        content = b'photo bytes'
+        digest = hashlib.sha256(content).hexdigest()
+
+        name = self.storage.save('uploads/recipe/a.JPG', ContentFile(content))
+
+        self.assertEqual(
+            name,
+            f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg',
+        )
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_identical_content_stored_once(self):
+        """Test saving the same content twice reuses the file."""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'same'))
+        other = self.storage.save('uploads/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(
+            os.listdir(self.storage.path(self.storage.incoming_dir)), []
+        )
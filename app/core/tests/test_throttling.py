@@ -0,0 +1,211 @@
+"""
+Tests for the login and sign up throttles.
+"""
+import base64
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.throttling import IPThrottle, SlidingWindowThrottle
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+RATES = {
+    'login_ip': '4/min',
+    'login_email': '2/min',
+    'signup_ip': '2/min',
+    'signup_email': '1/min',
+    'refresh_ip': '2/min',
+}
+THROTTLE_SETTINGS = {
+    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES,
+}
+
+
+class ThrottledView:
+    throttle_scope = 'login'
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_SETTINGS)
+class SlidingWindowTests(SimpleTestCase):
+    """Test the sliding window estimate."""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.request = APIRequestFactory().post(TOKEN_URL)
+        self.now = 600.0
+
+    def _allow(self):
+        """Run one request through a fresh throttle at `self.now`."""
+        throttle = IPThrottle()
+        throttle.timer = lambda: self.now
+        self.throttle = throttle
+        return throttle.allow_request(self.request, ThrottledView())
+
+    def test_limit_within_window(self):
+        """Test requests past the limit are rejected."""
+        self.assertEqual(
+            [self._allow() for _ in range(5)], [True] * 4 + [False]
+        )
+        self.assertEqual(self.throttle.wait(), 60)
+
+    def test_previous_window_weighed_by_overlap(self):
+        """Test the previous window counts for its remaining overlap."""
+        for _ in range(4):
+            self._allow()
+
+        # Three quarters into the next window a quarter of it remains.
+        self.now += 105
+        self.assertEqual(
+            [self._allow() for _ in range(4)], [True] * 3 + [False]
+        )
+
+    def test_unknown_scope_not_throttled(self):
+        """Test views without a rate are not throttled."""
+        view = ThrottledView()
+        view.throttle_scope = 'other'
+
+        self.assertTrue(all(
+            IPThrottle().allow_request(self.request, view)
+            for _ in range(10)
+        ))
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_SETTINGS)
+class LoginThrottleTests(TestCase):
+    """Test throttling the token and sign up endpoints."""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        # Keep every attempt in one window.
+        timer = patch.object(SlidingWindowThrottle, 'timer', return_value=600)
+        timer.start()
+        self.addCleanup(timer.stop)
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def _login(self, email, password='wrongpass', ip='10.0.0.1'):
+        """Post credentials from a client IP and return the response."""
+        return self.client.post(
+            TOKEN_URL,
+            {'email': email, 'password': password},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_throttled_per_email(self):
+        """Test an email is throttled across client IPs."""
+        self._login('user@example.com', ip='10.0.0.1')
+        self._login('user@example.com', ip='10.0.0.2')
+
+        res = self._login('User@Example.com', 'testpass123', ip='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_throttled_per_ip(self):
+        """Test a client IP is throttled across emails."""
+        for i in range(4):
+            self._login(f'user{i}@example.com')
+
+        res = self._login('user@example.com', 'testpass123')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_other_clients_unaffected(self):
+        """Test other emails from other IPs still log in."""
+        for i in range(5):
+            self._login('user@example.com', ip=f'10.0.0.{i}')
+
+        res = self._login('other@example.com', ip='10.0.1.1')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_throttled_before_hashing(self):
+        """Test rejected attempts never check a password."""
+        self._login('user@example.com')
+        self._login('user@example.com')
+
+        with patch('user.serializers.authenticate') as authenticate:
+            self._login('user@example.com')
+
+        authenticate.assert_not_called()
+
+    def test_forwarded_for_not_trusted(self):
+        """Test rotating X-Forwarded-For does not reset the IP limit."""
+        for i in range(4):
+            self.client.post(
+                TOKEN_URL,
+                {'email': f'user{i}@example.com', 'password': 'wrongpass'},
+                REMOTE_ADDR='10.0.0.1',
+                HTTP_X_FORWARDED_FOR=f'192.168.0.{i}',
+            )
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'user@example.com', 'password': 'wrongpass'},
+            REMOTE_ADDR='10.0.0.1',
+            HTTP_X_FORWARDED_FOR='192.168.0.9',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_basic_auth_throttled(self):
+        """Test credentials in headers are throttled, not authenticated."""
+        credentials = base64.b64encode(b'user@example.com:guess').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+
+        with patch.object(
+            get_user_model(), 'check_password'
+        ) as check_password:
+            responses = [self._login('other@example.com') for _ in range(5)]
+
+        check_password.assert_not_called()
+        self.assertEqual(
+            responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    def test_refresh_throttled(self):
+        """Test refresh attempts are throttled per IP."""
+        for _ in range(2):
+            res = self.client.post(REFRESH_URL, {'refresh': 'invalid'})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(REFRESH_URL, {'refresh': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_non_object_body_rejected(self):
+        """Test bodies that are not objects are invalid, not errors."""
+        for url in (TOKEN_URL, CREATE_USER_URL):
+            res = self.client.post(url, [1, 2], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sign_up_throttled(self):
+        """Test sign ups are throttled per IP."""
+        payload = {'password': 'testpass123', 'name': 'Test'}
+        for i in range(2):
+            res = self.client.post(
+                CREATE_USER_URL, {**payload, 'email': f'new{i}@example.com'}
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(
+            CREATE_USER_URL, {**payload, 'email': 'new2@example.com'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='new2@example.com').exists()
+        )
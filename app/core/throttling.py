@@ -0,0 +1,106 @@
+"""
+Sliding window throttles for the login and sign up endpoints.
+
+DRF runs throttles before the view, so rejected attempts never reach
+password hashing. Each throttle keeps two fixed window counters in the
+`throttle` cache and weighs the previous window by how much of it still
+overlaps the sliding window, which needs one atomic increment per
+request instead of a list of timestamps.
+"""
+import hashlib
+import time
+from collections.abc import Mapping
+
+from django.core.cache import caches
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) of a DRF rate such as '5/min'."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Limit requests per identity over a sliding window.
+
+    The rate comes from DEFAULT_THROTTLE_RATES under
+    `<view.throttle_scope>_<scope_suffix>`; a missing rate disables the
+    throttle.
+    """
+    scope_suffix = None
+    timer = time.time
+
+    def get_identity(self, request):
+        """Return what requests are counted by, or None to skip them."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+        scope = f'{scope}_{self.scope_suffix}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        identity = self.get_identity(request)
+        if rate is None or identity is None:
+            return True
+
+        self.num_requests, self.duration = parse_rate(rate)
+        digest = hashlib.sha256(str(identity).encode()).hexdigest()
+        window, self.elapsed = divmod(self.timer(), self.duration)
+        key = f'throttle:{scope}:{digest}:{int(window)}'
+        previous_key = f'throttle:{scope}:{digest}:{int(window) - 1}'
+
+        cache = caches['throttle']
+        counts = cache.get_many([key, previous_key])
+        self.current = counts.get(key, 0)
+        self.previous = counts.get(previous_key, 0)
+        overlap = 1 - self.elapsed / self.duration
+        if self.previous * overlap + self.current >= self.num_requests:
+            return False
+
+        # Counters outlive their window so the next one can weigh them.
+        cache.add(key, 0, self.duration * 2)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, self.duration * 2)
+        return True
+
+    def wait(self):
+        """Return the seconds until the estimate drops under the limit."""
+        if self.current >= self.num_requests:
+            return self.duration - self.elapsed
+        # Time for the previous window's weight to fall far enough.
+        needed = 1 - (self.num_requests - self.current) / self.previous
+        return max(needed * self.duration - self.elapsed, 0)
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Throttle requests per client IP address.
+
+    X-Forwarded-For is only trusted for the NUM_PROXIES setting's
+    proxies, otherwise the address is REMOTE_ADDR.
+    """
+    scope_suffix = 'ip'
+
+    def get_identity(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """Throttle requests per email address in the request body."""
+    scope_suffix = 'email'
+
+    def get_identity(self, request):
+        # Leave bodies that are not objects to the serializer to reject.
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
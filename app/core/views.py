@@ -0,0 +1,27 @@
+"""
+Views for the core APIs.
+"""
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from core.database import connection_stats
+
+
+class DatabaseStatsView(APIView):
+    """Return the database connection statistics of this worker."""
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(connection_stats())
@@ -0,0 +1,109 @@
+"""
+Async viewsets for serving the recipe APIs under ASGI.
+
+DRF dispatches synchronously, so under an ASGI server every request
+would hold a thread while it waits on the database. AsyncViewSetMixin
+dispatches on the event loop instead: actions written as coroutines read
+with the async ORM, and the remaining actions run in a thread through
+sync_to_async, as Django does for sync views.
+"""
+import inspect
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+
+from rest_framework.response import Response
+
+# Rows fetched per database round trip by unpaginated lists.
+CHUNK_SIZE = 2000
+
+
+class AsyncViewSetMixin:
+    """Dispatch a viewset on the event loop."""
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting the handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication, permissions and throttles use the cache
+            # and the database synchronously.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            method = request.method.lower()
+            handler = self.http_method_not_allowed
+            if method in self.http_method_names:
+                handler = getattr(self, method, handler)
+            # Schema decorators wrap inherited actions in sync functions
+            # that still return the coroutine.
+            if not iscoroutinefunction(inspect.unwrap(handler)):
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+class AsyncListModelMixin:
+    """List a queryset with the async ORM."""
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(
+                queryset, request, view=self
+            )
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        objects = [obj async for obj in queryset.aiterator(CHUNK_SIZE)]
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+
+class AsyncRetrieveModelMixin:
+    """Retrieve an object with the async ORM."""
+
+    async def aget_object(self):
+        """Async get_object."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -0,0 +1,249 @@
+"""
+Prefix and typo tolerant autocomplete for tags and ingredients.
+
+Each engine returns up to `limit` objects of `model` owned by `user`
+whose name matches `term`, best matches first.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    Lookup,
+    Q,
+    Value,
+    When,
+)
+from django.utils.module_loading import import_string
+
+from recipe.cache import get_version
+
+
+class ILike(Lookup):
+    """`lhs ILIKE rhs`, with `rhs` a ready LIKE pattern.
+
+    Django compiles istartswith to `UPPER(lhs) LIKE UPPER(rhs)` on
+    PostgreSQL, which a trigram index of the bare column cannot serve.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', (*lhs_params, *rhs_params)
+
+
+class TrigramAutocompleteEngine:
+    """Match names with the per-user trigram GIN index on PostgreSQL."""
+
+    def complete(self, model, user, term, limit):
+        starts = ILike(
+            F('name'), connection.ops.prep_for_like_query(term) + '%'
+        )
+        return list(model.objects.filter(user=user).filter(
+            Q(starts) | Q(name__trigram_word_similar=term)
+        ).annotate(
+            prefix=Case(
+                When(starts, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramWordSimilarity(term, 'name'),
+        ).only('id', 'name').order_by('-prefix', '-similarity', 'name')[
+            :limit
+        ])
+
+
+def next_row(row, term, char):
+    """Extend a row of Levenshtein distances by one character.
+
+    `row[j]` is the distance from some prefix to `term[:j]`, the result
+    is the same for that prefix followed by `char`.
+    """
+    current = [row[0] + 1]
+    for j, term_char in enumerate(term, 1):
+        current.append(min(
+            row[j] + 1,
+            current[j - 1] + 1,
+            row[j - 1] + (term_char != char),
+        ))
+    return current
+
+
+class SortedNameIndex:
+    """Sorted arrays over the names and word-start suffixes of a user.
+
+    Prefix lookups are a binary search. Typo tolerant lookups walk the
+    sorted suffixes as a trie, skipping every prefix already too many
+    edits away, so they only visit suffixes close to the term.
+    """
+
+    def __init__(self, rows):
+        self.names = dict(rows)
+        self.full = sorted(
+            (name.lower(), pk) for pk, name in self.names.items()
+        )
+        self.keys = sorted(
+            (suffix, pk)
+            for pk, name in self.names.items()
+            for suffix in self._suffixes(name.lower())
+        )
+        self.full_words = [key for key, _ in self.full]
+        self.words = [key for key, _ in self.keys]
+
+    @staticmethod
+    def _suffixes(name):
+        """Yield the name from the start of each of its words."""
+        start = 0
+        for word in name.split():
+            start = name.index(word, start)
+            yield name[start:]
+            start += len(word)
+
+    @staticmethod
+    def _bounds(words, prefix, lo=0, hi=None):
+        """Return the start and end of the words starting with prefix."""
+        hi = len(words) if hi is None else hi
+        start = bisect.bisect_left(words, prefix, lo, hi)
+        return start, bisect.bisect_left(words, prefix + '\uffff', start, hi)
+
+    def _prefix_matches(self, term, limit):
+        """Return up to limit ids of names with a word starting with term.
+
+        Names starting with term come first, then names with a later
+        word starting with it, each in name order.
+        """
+        start, end = self._bounds(self.full_words, term)
+        matches = [pk for _, pk in self.full[start:min(end, start + limit)]]
+
+        seen = set(matches)
+        words = []
+        start, end = self._bounds(self.words, term)
+        for i in range(start, end):
+            if len(matches) + len(words) >= limit:
+                break
+            pk = self.keys[i][1]
+            if pk not in seen:
+                seen.add(pk)
+                words.append(pk)
+        return matches + sorted(
+            words, key=lambda pk: (self.names[pk].lower(), pk)
+        )
+
+    def _typo_ranges(self, term, typos):
+        """Return (distance, start, end) of suffixes matching with typos.
+
+        A suffix matches when its first len(term) - 1 to len(term) + 1
+        characters are at most `typos` edits from the term. The first
+        letter must match.
+        """
+        ranges = []
+        stack = [(
+            term[0],
+            *self._bounds(self.words, term[0]),
+            next_row(list(range(len(term) + 1)), term, term[0]),
+        )]
+        while stack:
+            prefix, lo, hi, row = stack.pop()
+            if lo == hi:
+                continue
+            depth = len(prefix)
+            if row[-1] <= typos:
+                if depth >= len(term) - 1:
+                    ranges.append((row[-1], lo, hi))
+                elif self.words[lo] == prefix:
+                    # Suffixes shorter than the term match as a whole.
+                    ranges.append(
+                        (row[-1], lo, bisect.bisect_right(
+                            self.words, prefix, lo, hi
+                        ))
+                    )
+            if depth > len(term) or min(row) > typos:
+                continue
+
+            # Suffixes equal to the prefix sort first, then one range
+            # per next character.
+            lo = bisect.bisect_right(self.words, prefix, lo, hi)
+            while lo < hi:
+                char = self.words[lo][depth]
+                end = self._bounds(self.words, prefix + char, lo, hi)[1]
+                stack.append(
+                    (prefix + char, lo, end, next_row(row, term, char))
+                )
+                lo = end
+        return ranges
+
+    def complete(self, term, limit):
+        """Return (id, name) pairs matching term, best first."""
+        term = term.lower()
+        matches = self._prefix_matches(term, limit)
+
+        if len(matches) < limit and len(term) >= 3:
+            typos = 1 if len(term) <= 5 else 2
+            seen = set(matches)
+            fuzzy = {}
+            for distance, start, end in sorted(
+                self._typo_ranges(term, typos)
+            ):
+                for i in range(start, end):
+                    if len(matches) + len(fuzzy) >= limit:
+                        break
+                    pk = self.keys[i][1]
+                    if pk not in seen:
+                        seen.add(pk)
+                        fuzzy[pk] = distance
+            matches += sorted(
+                fuzzy, key=lambda pk: (fuzzy[pk], self.names[pk].lower())
+            )
+
+        return [(pk, self.names[pk]) for pk in matches]
+
+
+class SortedIndexAutocompleteEngine:
+    """Keep an in-process sorted index per user and model.
+
+    Indexes are keyed by the user's data version, so any write to the
+    user's tags, ingredients or recipes rebuilds the index on next use.
+    """
+    max_indexes = 1024
+    _indexes = OrderedDict()
+    _lock = threading.Lock()
+
+    def _index(self, model, user):
+        """Return a current index of the user's names for model."""
+        key = (model._meta.label, user.pk, get_version(user.pk))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        index = SortedNameIndex(
+            model.objects.filter(user=user).values_list('id', 'name')
+        )
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def complete(self, model, user, term, limit):
+        return [
+            model(id=pk, name=name, user=user)
+            for pk, name in self._index(model, user).complete(term, limit)
+        ]
+
+
+def get_autocomplete_engine():
+    """Return the configured engine, or the best one for the database."""
+    if settings.RECIPE_AUTOCOMPLETE_ENGINE:
+        return import_string(settings.RECIPE_AUTOCOMPLETE_ENGINE)()
+    if connection.vendor == 'postgresql':
+        return TrigramAutocompleteEngine()
+    return SortedIndexAutocompleteEngine()
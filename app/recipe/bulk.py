@@ -0,0 +1,152 @@
+"""
+Set based writes for recipes and their tags and ingredients.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_version
+
+RELATED_MODELS = {'tags': Tag, 'ingredients': Ingredient}
+
+
+def _by_name(model, user, names):
+    """Return a name to object map of the user's existing rows."""
+    return {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+
+
+def resolve_names(model, user, names):
+    """Return a name to object map, creating missing rows in bulk.
+
+    Rows created by a concurrent request between the lookup and the
+    insert are skipped by the per-user unique constraint and picked up
+    by a second lookup, so no duplicates or IntegrityErrors occur.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    found = _by_name(model, user, names)
+    missing = names - found.keys()
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        found.update(_by_name(model, user, missing))
+    return found
+
+
+def _wanted_links(recipes_items, field, user):
+    """Return the (recipe id, item id) pairs the recipes should have."""
+    objs = resolve_names(
+        RELATED_MODELS[field],
+        user,
+        (item['name'] for _, items in recipes_items for item in items),
+    )
+    return {
+        (recipe.pk, objs[item['name']].pk)
+        for recipe, items in recipes_items
+        for item in items
+    }
+
+
+def _insert_links(through, source, target, rows):
+    """Insert through rows for (recipe id, item id) pairs."""
+    through.objects.bulk_create([
+        through(**{f'{source}_id': recipe_id, f'{target}_id': obj_id})
+        for recipe_id, obj_id in rows
+    ])
+
+
+def _link(recipes_items, field, user):
+    """Insert the through rows linking each recipe to its items."""
+    m2m = Recipe._meta.get_field(field)
+    _insert_links(
+        m2m.remote_field.through,
+        m2m.m2m_field_name(),
+        m2m.m2m_reverse_field_name(),
+        _wanted_links(recipes_items, field, user),
+    )
+
+
+def _replace_links(recipes_items, field, user):
+    """Set the membership of `field` on the given recipes.
+
+    Only the through rows that differ from the wanted membership are
+    deleted or inserted.
+    """
+    if not recipes_items:
+        return
+    m2m = Recipe._meta.get_field(field)
+    through = m2m.remote_field.through
+    source = m2m.m2m_field_name()
+    target = m2m.m2m_reverse_field_name()
+
+    current = {
+        (recipe_id, obj_id): pk
+        for pk, recipe_id, obj_id in through.objects.filter(**{
+            f'{source}_id__in': [recipe.pk for recipe, _ in recipes_items]
+        }).values_list('pk', f'{source}_id', f'{target}_id')
+    }
+    wanted = _wanted_links(recipes_items, field, user)
+
+    stale = [pk for row, pk in current.items() if row not in wanted]
+    if stale:
+        through.objects.filter(pk__in=stale).delete()
+    _insert_links(through, source, target, wanted - current.keys())
+
+
+def bulk_save_recipes(user, creates, updates):
+    """Create and update recipes with bulk statements in one transaction.
+
+    `creates` is a list of validated data dicts and `updates` a list of
+    (recipe, validated data) pairs. Returns the created recipes followed
+    by the updated ones.
+    """
+    related = {field: [] for field in RELATED_MODELS}
+    now = timezone.now()
+
+    with transaction.atomic():
+        new_recipes = []
+        for data in creates:
+            data = dict(data)
+            items = {
+                field: data.pop(field, []) for field in RELATED_MODELS
+            }
+            recipe = Recipe(user=user, **data)
+            new_recipes.append((recipe, items))
+        Recipe.objects.bulk_create([recipe for recipe, _ in new_recipes])
+
+        for recipe, items in new_recipes:
+            for field, values in items.items():
+                related[field].append((recipe, values))
+        for field, recipes_items in related.items():
+            _link(recipes_items, field, user)
+
+        replaced = {field: [] for field in RELATED_MODELS}
+        update_fields = {'updated_at'}
+        for recipe, data in updates:
+            data = dict(data)
+            for field in RELATED_MODELS:
+                values = data.pop(field, None)
+                if values is not None:
+                    replaced[field].append((recipe, values))
+            for attr, value in data.items():
+                setattr(recipe, attr, value)
+                update_fields.add(attr)
+            recipe.updated_at = now
+        if updates:
+            Recipe.objects.bulk_update(
+                [recipe for recipe, _ in updates], sorted(update_fields)
+            )
+        for field, recipes_items in replaced.items():
+            _replace_links(recipes_items, field, user)
+
+    bump_version(user.pk)
+
+    return [recipe for recipe, _ in new_recipes] + [
+        recipe for recipe, _ in updates
+    ]
@@ -0,0 +1,142 @@
+"""
+Versioned response cache for the recipe APIs.
+
+Each user has a data version stored in the cache. Cached responses are
+keyed by that version, so bumping it on a write makes every older entry
+unreachable without scanning or deleting keys.
+
+A per-process cache only sees the bumps of writes its own worker
+handled, so there versions expire after RECIPE_LOCAL_VERSION_TTL
+seconds, which bounds how long another worker serves stale data.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.caching import shared_cache
+
+
+def _version_key(user_id):
+    """Return the cache key holding a user's data version."""
+    return f'recipe:version:{user_id}'
+
+
+def _version_timeout():
+    """Return the seconds a data version is kept, or None for ever."""
+    if shared_cache(DEFAULT_CACHE_ALIAS) is None:
+        return settings.RECIPE_LOCAL_VERSION_TTL
+    return None
+
+
+def get_version(user_id):
+    """Return the current data version for a user."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never repeats.
+        cache.add(key, time.time_ns(), _version_timeout())
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(user_id):
+    """Async get_version."""
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), _version_timeout())
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate every cached response for a user."""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), _version_timeout())
+
+
+def response_key(request, version):
+    """Return the cache key for a request at a given data version."""
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(
+        repr((request.get_host(), request.path, params)).encode()
+    ).hexdigest()
+    return f'recipe:response:{request.user.pk}:{version}:{digest}'
+
+
+class CachedResponseMixin:
+    """Serve repeated GETs of a viewset from the response cache."""
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        """Return a cached response or build and store a new one."""
+        timeout = settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+        if not timeout:
+            return handler(request, *args, **kwargs)
+
+        key = response_key(request, get_version(request.user.pk))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+        return response
+
+    async def _acached_response(self, handler, request, *args, **kwargs):
+        """Async _cached_response, awaiting a coroutine handler."""
+        timeout = settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+        if not timeout:
+            return await handler(request, *args, **kwargs)
+
+        key = response_key(request, await aget_version(request.user.pk))
+        data = await cache.aget(key)
+        if data is not None:
+            return Response(data)
+
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(key, response.data, timeout)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Cache the list action of a viewset."""
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Cache the retrieve action of a viewset."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class AsyncCachedListMixin(CachedResponseMixin):
+    """Cache the async list action of a viewset."""
+
+    async def list(self, request, *args, **kwargs):
+        return await self._acached_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class AsyncCachedRetrieveMixin(CachedResponseMixin):
+    """Cache the async retrieve action of a viewset."""
+
+    async def retrieve(self, request, *args, **kwargs):
+        return await self._acached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,133 @@
+"""
+Conditional GET support for the recipe APIs.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from recipe.cache import aget_version, get_version
+
+
+def make_etag(request, *parts):
+    """Return a strong ETag for a representation of `parts`.
+
+    The query params and negotiated media type are part of the tag, as
+    they change the body returned for the same data.
+    """
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(
+        repr((parts, params, request.accepted_media_type)).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs on recipes without serializing.
+
+    Detail validators come from `Recipe.updated_at`, so a 304 only costs
+    one small query. List validators come from the owner's data version
+    in the response cache, which every write bumps, deletes included, so
+    they cost no query at all. Lists have no Last-Modified, as the
+    newest `updated_at` does not change when an older recipe is deleted.
+    With a per-process cache a list can be answered with 304 for up to
+    RECIPE_LOCAL_VERSION_TTL seconds after a write another worker made.
+    """
+
+    def _check_conditions(self, validators, request):
+        """Return the ETag, timestamp and a 304 response or None."""
+        last_modified, *parts = validators
+        etag = make_etag(request, last_modified, *parts)
+        timestamp = last_modified.timestamp() if last_modified else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        return etag, timestamp, response
+
+    def _set_validators(self, response, etag, timestamp):
+        """Add the validators to a response."""
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def _conditional_response(self, handler, validators, request, *args,
+                              **kwargs):
+        """Return 304 when the client copy is fresh, else the response."""
+        etag, timestamp, response = self._check_conditions(
+            validators, request
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self._set_validators(response, etag, timestamp)
+
+    def _retrieve_validators(self, kwargs):
+        """Return the query of the retrieved row's `updated_at`.
+
+        Raises TypeError or ValueError for a malformed lookup.
+        """
+        lookup = {self.lookup_field: kwargs[self.lookup_field]}
+        return self.get_queryset().prefetch_related(
+            None
+        ).filter(**lookup).values_list('updated_at', flat=True)
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(request.user.pk)
+        return self._conditional_response(
+            super().list,
+            (None, request.user.pk, version),
+            request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            last_modified = self._retrieve_validators(kwargs).first()
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        return self._conditional_response(
+            super().retrieve,
+            (last_modified, kwargs[self.lookup_field]),
+            request, *args, **kwargs
+        )
+
+
+class AsyncConditionalGetMixin(ConditionalGetMixin):
+    """ConditionalGetMixin for async list and retrieve actions."""
+
+    async def _aconditional_response(self, handler, validators, request,
+                                     *args, **kwargs):
+        """Async _conditional_response, awaiting a coroutine handler."""
+        etag, timestamp, response = self._check_conditions(
+            validators, request
+        )
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        return self._set_validators(response, etag, timestamp)
+
+    async def list(self, request, *args, **kwargs):
+        version = await aget_version(request.user.pk)
+        return await self._aconditional_response(
+            super().list,
+            (None, request.user.pk, version),
+            request, *args, **kwargs
+        )
+
+    async def retrieve(self, request, *args, **kwargs):
+        try:
+            last_modified = await self._retrieve_validators(kwargs).afirst()
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            return await super().retrieve(
+                request, *args, **kwargs
+            )
+
+        return await self._aconditional_response(
+            super().retrieve,
+            (last_modified, kwargs[self.lookup_field]),
+            request, *args, **kwargs
+        )
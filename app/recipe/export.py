@@ -0,0 +1,92 @@
+"""
+Streaming export of recipes as NDJSON or CSV.
+"""
+import csv
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from recipe.serializers import RecipeDetailSerializer
+
+CSV_COLUMNS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link',
+    'image', 'tags', 'ingredients',
+]
+# Separates tag and ingredient names inside a CSV cell.
+NAME_SEPARATOR = ';'
+
+
+class Echo:
+    """File-like object handing back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_recipes(queryset, chunk_size, context=None):
+    """Yield recipes serialized one at a time.
+
+    Rows are read with a database cursor `chunk_size` at a time and the
+    tags and ingredients are prefetched per chunk, so memory use does
+    not grow with the number of recipes.
+    """
+    serializer = RecipeDetailSerializer(context=context or {})
+    recipes = queryset.prefetch_related('tags', 'ingredients').iterator(
+        chunk_size=chunk_size
+    )
+    for recipe in recipes:
+        yield serializer.to_representation(recipe)
+
+
+async def aiter_recipes(queryset, chunk_size, context=None):
+    """Async iter_recipes, reading rows with aiterator()."""
+    serializer = RecipeDetailSerializer(context=context or {})
+    recipes = queryset.prefetch_related('tags', 'ingredients').aiterator(
+        chunk_size=chunk_size
+    )
+    async for recipe in recipes:
+        yield serializer.to_representation(recipe)
+
+
+def ndjson_row(recipe):
+    """Return a recipe as one JSON document on its own line."""
+    return json.dumps(recipe, cls=JSONEncoder) + '\n'
+
+
+def csv_row(recipe):
+    """Return a recipe as a CSV line."""
+    for field in ('tags', 'ingredients'):
+        recipe[field] = NAME_SEPARATOR.join(
+            item['name'] for item in recipe[field]
+        )
+    return csv.writer(Echo()).writerow(
+        '' if recipe[column] is None else recipe[column]
+        for column in CSV_COLUMNS
+    )
+
+
+# Content type, header line and row renderer of each format.
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', None, ndjson_row),
+    'csv': (
+        'text/csv', csv.writer(Echo()).writerow(CSV_COLUMNS), csv_row,
+    ),
+}
+
+
+def render_rows(export_format, recipes):
+    """Yield the lines of an export of serialized recipes."""
+    _, header, render = EXPORT_FORMATS[export_format]
+    if header is not None:
+        yield header
+    for recipe in recipes:
+        yield render(recipe)
+
+
+async def arender_rows(export_format, recipes):
+    """Async render_rows, for recipes from aiter_recipes()."""
+    _, header, render = EXPORT_FORMATS[export_format]
+    if header is not None:
+        yield header
+    async for recipe in recipes:
+        yield render(recipe)
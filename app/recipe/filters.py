@@ -0,0 +1,73 @@
+"""
+Query filters for the recipe APIs.
+"""
+from django.db.models import Count, Exists, OuterRef
+
+from core.models import Recipe
+
+
+def filter_by_related(queryset, field, ids, match_all=False):
+    """Filter recipes linked to `ids` through the `field` many-to-many.
+
+    Matching is done with a semi-join on the through table, so the
+    recipe rows never need a DISTINCT. With `match_all` only recipes
+    linked to every one of `ids` are kept, using a single grouped
+    subquery.
+    """
+    m2m = Recipe._meta.get_field(field)
+    through = m2m.remote_field.through
+    source = m2m.m2m_field_name()
+    target = m2m.m2m_reverse_field_name()
+    ids = set(ids)
+
+    if match_all:
+        matching = through.objects.filter(
+            **{f'{target}__in': ids}
+        ).values(source).annotate(
+            matched=Count(target)
+        ).filter(matched=len(ids)).values(source)
+        return queryset.filter(pk__in=matching)
+
+    return queryset.filter(Exists(through.objects.filter(
+        **{source: OuterRef('pk'), f'{target}__in': ids}
+    )))
+
+
+def filter_by_range(queryset, field, low=None, high=None):
+    """Filter recipes whose `field` lies between `low` and `high`.
+
+    Either bound may be None to leave that side open. Both bounds are
+    inclusive.
+    """
+    if low is not None:
+        queryset = queryset.filter(**{f'{field}__gte': low})
+    if high is not None:
+        queryset = queryset.filter(**{f'{field}__lte': high})
+    return queryset
+
+
+def facet_counts(recipes, field):
+    """Return the items of `field` used by `recipes` with recipe counts.
+
+    Counts come from one grouped query on the through table, most used
+    items first.
+    """
+    m2m = Recipe._meta.get_field(field)
+    through = m2m.remote_field.through
+    source = m2m.m2m_field_name()
+    target = m2m.m2m_reverse_field_name()
+
+    rows = through.objects.filter(
+        **{f'{source}__in': recipes.values('pk')}
+    ).values(f'{target}_id', f'{target}__name').annotate(
+        count=Count(source)
+    ).order_by('-count', f'{target}__name')
+
+    return [
+        {
+            'id': row[f'{target}_id'],
+            'name': row[f'{target}__name'],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
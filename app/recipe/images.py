@@ -0,0 +1,250 @@
+"""
+Resized derivatives of recipe images.
+
+Uploads are re-encoded into a few sizes and formats by a pool of
+worker processes, so requests only pay for storing the original.
+Stored images are shared by every recipe with the same content and
+reference counted, their files go once the last reference does.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Recipe, StoredImage
+from recipe.cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels of each derivative.
+DERIVATIVE_SIZES = (1024, 512, 128)
+# File extension to Pillow format and encoder options.
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def derivative_name(name, size, extension):
+    """Return the storage name of a derivative of the image `name`."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, 'derivatives', stem, f'{size}.{extension}'
+    )
+
+
+def _flatten(image):
+    """Return an RGB copy of image, painting transparency white."""
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_derivatives(data):
+    """Return {(size, extension): bytes} for an encoded image.
+
+    Images are rotated upright from their EXIF orientation, and the
+    metadata is not written back. Each size is scaled down from the
+    previous one and images are never enlarged.
+    """
+    image = Image.open(io.BytesIO(data))
+    # Lets JPEG decode straight to a smaller scale when possible.
+    image.draft('RGB', (DERIVATIVE_SIZES[0], DERIVATIVE_SIZES[0]))
+    icc_profile = image.info.get('icc_profile')
+    image = _flatten(ImageOps.exif_transpose(image))
+
+    rendered = {}
+    for size in DERIVATIVE_SIZES:
+        image.thumbnail((size, size), Image.LANCZOS)
+        for extension, (image_format, options) in DERIVATIVE_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(
+                buffer, image_format, icc_profile=icc_profile, **options
+            )
+            rendered[(size, extension)] = buffer.getvalue()
+    return rendered
+
+
+def image_lookup(name):
+    """Return a Q matching recipes whose image is `name` or its source.
+
+    Derivatives are stored as `<dir>/derivatives/<stem>/<file>`, and
+    their source image as `<dir>/<stem>.<ext>`.
+    """
+    parts = name.split('/')
+    if len(parts) >= 3 and parts[-3] == 'derivatives':
+        source = '/'.join(parts[:-3] + [parts[-2]])
+        return Q(image__startswith=f'{source}.')
+    return Q(image=name)
+
+
+def derivative_names(name):
+    """Return the storage names of every derivative of `name`."""
+    return [
+        derivative_name(name, size, extension)
+        for size in DERIVATIVE_SIZES
+        for extension in DERIVATIVE_FORMATS
+    ]
+
+
+def mark_derivatives_ready(name):
+    """Record the derivatives of `name` as stored.
+
+    Recipes using the image are touched and their owners' cached
+    responses invalidated, as their representation now changes.
+    """
+    if not StoredImage.objects.filter(
+        name=name, derivatives_ready=False
+    ).update(derivatives_ready=True):
+        return
+    recipes = Recipe.objects.filter(image=name)
+    recipes.update(updated_at=timezone.now())
+    for user_id in recipes.values_list('user_id', flat=True).distinct():
+        bump_version(user_id)
+
+
+def with_derivatives_ready(queryset):
+    """Annotate recipes with whether their image derivatives exist."""
+    return queryset.annotate(image_derivatives_ready=Exists(
+        StoredImage.objects.filter(
+            name=OuterRef('image'), derivatives_ready=True
+        )
+    ))
+
+
+def derivatives_ready(name):
+    """Return whether every derivative of `name` is stored."""
+    return StoredImage.objects.filter(
+        name=name, derivatives_ready=True
+    ).exists()
+
+
+def generate_derivatives(name):
+    """Render and store every derivative of the stored image `name`.
+
+    Images already having every derivative, such as a second upload of
+    the same content, are skipped.
+    """
+    names = derivative_names(name)
+    if all(default_storage.exists(target) for target in names):
+        mark_derivatives_ready(name)
+        return names
+
+    with Recipe.image.field.storage.open(name, 'rb') as file:
+        rendered = render_derivatives(file.read())
+
+    names = []
+    for (size, extension), content in rendered.items():
+        target = derivative_name(name, size, extension)
+        if default_storage.exists(target):
+            default_storage.delete(target)
+        names.append(default_storage.save(target, ContentFile(content)))
+    mark_derivatives_ready(name)
+    return names
+
+
+def get_executor():
+    """Return the process pool, starting it on first use.
+
+    Workers are spawned rather than forked, so they never share the
+    parent's database connections.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _executor
+
+
+def _log_failure(name, future):
+    """Log a derivative job that raised."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error(
+            'Generating derivatives of %s failed', name, exc_info=exc
+        )
+
+
+def schedule_derivatives(name):
+    """Generate the derivatives of `name` in the background.
+
+    With RECIPE_IMAGE_WORKERS set to 0 they are generated inline.
+    Returns a future of the stored derivative names.
+    """
+    if settings.RECIPE_IMAGE_WORKERS == 0:
+        future = Future()
+        try:
+            future.set_result(generate_derivatives(name))
+        except Exception as exc:
+            future.set_exception(exc)
+    else:
+        future = get_executor().submit(generate_derivatives, name)
+    future.add_done_callback(lambda done: _log_failure(name, done))
+    return future
+
+
+def retain_image(name):
+    """Count one more recipe using the stored image `name`."""
+    references = StoredImage.objects.filter(name=name)
+    if references.update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, ref_count=1)
+    except IntegrityError:
+        references.update(ref_count=F('ref_count') + 1)
+
+
+def delete_image_files(name):
+    """Delete an image and its derivatives unless referenced again.
+
+    The StoredImage row is locked like a save does, so a save of the
+    same content either finds the row and keeps the files, or waits and
+    stores the file again.
+    """
+    with transaction.atomic():
+        stored, created = StoredImage.objects.select_for_update(
+        ).get_or_create(name=name)
+        if not created:
+            return
+        Recipe.image.field.storage.delete(name)
+        for target in derivative_names(name):
+            default_storage.delete(target)
+        stored.delete()
+
+
+def release_image(name):
+    """Count one less recipe using `name`, deleting it when unused.
+
+    Files are deleted once the transaction commits, so a rollback
+    never loses an image still referenced.
+    """
+    references = StoredImage.objects.filter(name=name)
+    references.filter(ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1
+    )
+    deleted, _ = references.filter(ref_count=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_image_files(name))
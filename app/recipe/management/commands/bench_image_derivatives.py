@@ -0,0 +1,74 @@
+"""
+Django command to measure image derivative throughput.
+"""
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from PIL import Image
+
+from django.core.management.base import BaseCommand
+
+from recipe.images import render_derivatives
+
+
+def sample_image(width, height, seed):
+    """Return a JPEG photo-like test image as bytes."""
+    noise = Image.effect_noise((width, height), 32 + seed % 32)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', (noise, gradient, noise.transpose(
+        Image.FLIP_LEFT_RIGHT
+    )))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Django command to time rendering derivatives per worker count."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=40)
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument(
+            '--workers', default='0,1,2,4',
+            help='Comma separated pool sizes, 0 renders in this process.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Generating sample images....')
+        images = [
+            sample_image(options['width'], options['height'], seed)
+            for seed in range(options['images'])
+        ]
+        megabytes = sum(len(data) for data in images) / 1e6
+
+        for workers in (int(n) for n in options['workers'].split(',')):
+            if workers == 0:
+                start = time.perf_counter()
+                for data in images:
+                    render_derivatives(data)
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=django.setup,
+                ) as pool:
+                    # Start the workers before timing.
+                    list(pool.map(abs, range(workers)))
+                    start = time.perf_counter()
+                    list(pool.map(render_derivatives, images))
+            elapsed = time.perf_counter() - start
+
+            label = f'{workers} workers' if workers else 'inline'
+            self.stdout.write(
+                f'{label}: {len(images) / elapsed:.1f} images/s, '
+                f'{megabytes / elapsed:.1f} MB/s in '
+                f'{elapsed:.2f} s'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
@@ -0,0 +1,75 @@
+"""
+Django command to compare the recipe tag filter query plans.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Recipe, Tag
+from recipe.filters import filter_by_related
+from recipe.seed import seed_recipes
+
+
+def explain(queryset):
+    """Return the query plan, with real timings where supported."""
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True, buffers=True)
+    return queryset.explain()
+
+
+class Command(BaseCommand):
+    """Django command to benchmark JOIN + DISTINCT against EXISTS filters."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench@example.com')
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--filter-tags', type=int, default=3)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Seeding recipes....')
+        user = seed_recipes(
+            options['email'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+        )
+        tag_ids = list(
+            Tag.objects.filter(user=user).order_by('id').values_list(
+                'id', flat=True
+            )[:options['filter_tags']]
+        )
+        recipes = Recipe.objects.filter(user=user)
+
+        plans = {
+            'join + distinct (old)': recipes.filter(
+                tags__id__in=tag_ids
+            ).order_by('-id').distinct(),
+            'exists, match any': filter_by_related(
+                recipes, 'tags', tag_ids
+            ).order_by('-id'),
+            'grouped, match all': filter_by_related(
+                recipes, 'tags', tag_ids, match_all=True
+            ).order_by('-id'),
+        }
+
+        for name, queryset in plans.items():
+            page = queryset[:options['page_size']]
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(page.all())
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(explain(page))
+            self.stdout.write(
+                f'median {statistics.median(timings):.2f} ms, '
+                f'min {min(timings):.2f} ms over {options["repeat"]} runs\n'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
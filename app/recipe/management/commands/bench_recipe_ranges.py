@@ -0,0 +1,95 @@
+"""
+Django command to benchmark recipe range filters and sorting.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Recipe
+from recipe.filters import filter_by_range
+from recipe.management.commands.bench_recipe_filters import explain
+from recipe.seed import seed_recipes
+
+
+@contextmanager
+def index_scans(enabled):
+    """Run the block with index scans turned off when not `enabled`.
+
+    Only PostgreSQL can switch the planner, elsewhere this is a no-op.
+    """
+    with transaction.atomic():
+        if not enabled and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for scan in ('indexscan', 'indexonlyscan', 'bitmapscan'):
+                    cursor.execute(f'SET LOCAL enable_{scan} = off')
+        yield
+
+
+class Command(BaseCommand):
+    """Django command to time range filters with and without indexes."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench-ranges@example.com')
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def _plans(self, user):
+        """Return the benchmarked querysets by name."""
+        recipes = Recipe.objects.filter(user=user)
+        return {
+            'under 30 minutes, quickest first': filter_by_range(
+                recipes, 'time_minutes', high=30
+            ).order_by('time_minutes', 'id'),
+            'under $10, cheapest first': filter_by_range(
+                recipes, 'price', high=Decimal('10')
+            ).order_by('price', 'id'),
+            'under 30 minutes and $10, cheapest first': filter_by_range(
+                filter_by_range(recipes, 'time_minutes', high=30),
+                'price', high=Decimal('10'),
+            ).order_by('price', 'id'),
+            'price $20 to $40, most expensive first': filter_by_range(
+                recipes, 'price', low=Decimal('20'), high=Decimal('40')
+            ).order_by('-price', '-id'),
+            'all, slowest first': recipes.order_by('-time_minutes', '-id'),
+        }
+
+    def _time(self, page, repeat):
+        """Return the run timings of a page in milliseconds."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(page.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Seeding recipes....')
+        user = seed_recipes(options['email'], recipes=options['recipes'])
+        variants = [('indexed', True)]
+        if connection.vendor == 'postgresql':
+            variants.append(('index scans disabled', False))
+
+        for name, queryset in self._plans(user).items():
+            page = queryset[:options['page_size']]
+            for label, enabled in variants:
+                with index_scans(enabled):
+                    plan = explain(page)
+                    timings = self._time(page, options['repeat'])
+
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{name} ({label})'
+                ))
+                self.stdout.write(plan)
+                self.stdout.write(
+                    f'median {statistics.median(timings):.2f} ms, '
+                    f'min {min(timings):.2f} ms over '
+                    f'{options["repeat"]} runs\n'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
@@ -0,0 +1,209 @@
+"""
+Django command to compare WSGI and ASGI read throughput.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+import django
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from core.authentication import issue_signed_tokens
+from core.models import Ingredient, Recipe, Tag
+
+EMAIL = 'bench-asgi@example.com'
+
+
+def _add_latency(latency):
+    """Sleep `latency` seconds before every query, like a remote server."""
+    from django.db.backends.signals import connection_created
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+
+
+def _paths(recipe_ids):
+    """Return the request mix: recipe pages, recipes and tags."""
+    paths = []
+    for recipe_id in recipe_ids:
+        paths += [
+            (reverse('recipe:recipe-list'), 'page_size=20'),
+            (reverse('recipe:recipe-detail', args=[recipe_id]), ''),
+            (reverse('recipe:tag-list'), ''),
+        ]
+    return paths
+
+
+def run_wsgi(requests, token, concurrency, latency):
+    """Serve requests with a threaded WSGI handler, like gunicorn gthread."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    if latency:
+        _add_latency(latency)
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def call(request):
+        path, query = request
+        environ = factory.get(
+            path, QUERY_STRING=query, HTTP_HOST='localhost',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        ).environ
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, *_: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - start, statuses[0].startswith('200')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, requests))
+    return time.perf_counter() - start, results
+
+
+def run_asgi(requests, token, concurrency, latency):
+    """Serve requests with the ASGI handler on one event loop."""
+    from django.core.handlers.asgi import ASGIHandler
+
+    if latency:
+        _add_latency(latency)
+    handler = ASGIHandler()
+    headers = [
+        (b'host', b'localhost'),
+        (b'authorization', f'Bearer {token}'.encode()),
+    ]
+
+    async def call(request, slots):
+        path, query = request
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': query.encode(), 'headers': headers,
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        sent = []
+        received = asyncio.Event()
+
+        async def receive():
+            if received.is_set():
+                # The client stays connected until the response is sent.
+                await asyncio.Event().wait()
+            received.set()
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        async with slots:
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - start, sent[0]['status'] == 200
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(call(r, slots) for r in requests))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    return time.perf_counter() - start, results
+
+
+class Command(BaseCommand):
+    """Django command to time the read APIs under WSGI and ASGI."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=1500)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument(
+            '--latency', default='0,5',
+            help='Comma separated milliseconds added to every query.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Servers run in child processes, '
+                               'use a database stored on disk.')
+
+        self.stdout.write('Creating recipes....')
+        get_user_model().objects.filter(email=EMAIL).delete()
+        user = get_user_model().objects.create_user(email=EMAIL)
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(10)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}') for i in range(10)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user, title=f'Recipe {i}', time_minutes=i % 120,
+                price=Decimal(i % 50), description='Bench recipe',
+            )
+            for i in range(options['recipes'])
+        )
+        for i, recipe in enumerate(recipes):
+            recipe.tags.add(tags[i % 10], tags[(i + 1) % 10])
+            recipe.ingredients.add(ingredients[i % 10])
+
+        ids = [recipe.id for recipe in recipes]
+        requests = _paths(ids * (options['requests'] // (3 * len(ids)) + 1))
+        requests = requests[:options['requests']]
+
+        # Every request reads the database, not the response cache.
+        os.environ['RECIPE_RESPONSE_CACHE_TIMEOUT'] = '0'
+        try:
+            for latency in options['latency'].split(','):
+                for server in (run_wsgi, run_asgi):
+                    self._run(
+                        server, requests, user, options,
+                        float(latency) / 1000,
+                    )
+        finally:
+            get_user_model().objects.filter(email=EMAIL).delete()
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
+
+    def _run(self, server, requests, user, options, latency):
+        """Run one server in a fresh process and print its throughput."""
+        asgi = server is run_asgi
+        # Children read the setting picking the viewsets when they start.
+        os.environ['RECIPE_ASYNC_VIEWS'] = '1' if asgi else '0'
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        ) as pool:
+            elapsed, results = pool.submit(
+                server,
+                requests,
+                issue_signed_tokens(user)['access'],
+                options['concurrency'],
+                latency,
+            ).result()
+
+        latencies = sorted(seconds * 1000 for seconds, _ in results)
+        failed = sum(not ok for _, ok in results)
+        self.stdout.write(
+            f'{"ASGI" if asgi else "WSGI"}, {latency * 1000:g} ms query '
+            f'latency: {len(results) / elapsed:.0f} requests/s, '
+            f'p50 {latencies[len(latencies) // 2]:.0f} ms, '
+            f'p99 {latencies[int(len(latencies) * 0.99) - 1]:.0f} ms, '
+            f'{failed} failed'
+        )
@@ -0,0 +1,96 @@
+"""
+Django command to print the query plans of the recipe API views.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.seed import seed_recipes
+from recipe.views import RecipeViewSet, TagViewSet, IngredientViewSet
+
+
+def explain_sql(sql):
+    """Return the plan for a captured query, with timings if supported."""
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    else:
+        prefix = 'EXPLAIN QUERY PLAN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return '\n'.join(
+            ' '.join(str(col) for col in row) for row in cursor.fetchall()
+        )
+
+
+class Command(BaseCommand):
+    """Django command to seed data and explain every viewset query."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench@example.com')
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+
+    def _scenarios(self, user):
+        """Return (name, viewset, action, params, kwargs) tuples."""
+        recipe = Recipe.objects.filter(user=user).order_by('-id').first()
+        tag_ids, ingredient_ids = (
+            ','.join(str(pk) for pk in model.objects.filter(
+                user=user
+            ).order_by('id').values_list('id', flat=True)[:3])
+            for model in (Tag, Ingredient)
+        )
+
+        return [
+            ('recipe list', RecipeViewSet, 'list', {}, {}),
+            ('recipe list by tags', RecipeViewSet, 'list',
+             {'tags': tag_ids}, {}),
+            ('recipe list matching all tags', RecipeViewSet, 'list',
+             {'tags': tag_ids, 'tags_match': 'all'}, {}),
+            ('recipe list by ingredients', RecipeViewSet, 'list',
+             {'ingredients': ingredient_ids}, {}),
+            ('recipe list under $10, cheapest first', RecipeViewSet, 'list',
+             {'max_price': '10', 'ordering': 'price'}, {}),
+            ('recipe detail', RecipeViewSet, 'retrieve',
+             {}, {'pk': recipe.pk}),
+            ('tag list', TagViewSet, 'list', {}, {}),
+            ('tag list assigned only', TagViewSet, 'list',
+             {'assigned_only': 1}, {}),
+            ('ingredient list', IngredientViewSet, 'list', {}, {}),
+            ('ingredient list assigned only', IngredientViewSet, 'list',
+             {'assigned_only': 1}, {}),
+        ]
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Seeding recipes....')
+        user = seed_recipes(
+            options['email'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+        )
+        factory = APIRequestFactory()
+
+        for name, viewset, action, params, kwargs in self._scenarios(user):
+            request = factory.get('/', params, SERVER_NAME='localhost')
+            force_authenticate(request, user=user)
+            view = viewset.as_view({'get': action})
+
+            with override_settings(
+                ALLOWED_HOSTS=['localhost'],
+                RECIPE_RESPONSE_CACHE_TIMEOUT=0,
+            ), CaptureQueriesContext(connection) as ctx:
+                view(request, **kwargs).render()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for query in ctx.captured_queries:
+                self.stdout.write(query['sql'])
+                self.stdout.write(explain_sql(query['sql']))
+                self.stdout.write('')
+
+        self.stdout.write(self.style.SUCCESS('Explain complete!'))
@@ -0,0 +1,139 @@
+"""
+Responses serving stored media files.
+
+Files are handed to the front proxy with X-Accel-Redirect or X-Sendfile
+when configured, otherwise streamed with FileResponse, which lets the
+WSGI server use sendfile() for whole files.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Content addressed names hold the SHA-256 of the file or its source.
+CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{64}(/|\.)')
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of a file from `start`."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the (start, end) byte range asked for, inclusive.
+
+    Returns None to send the whole file, for a missing, malformed or
+    multi-part range, and raises ValueError for an unsatisfiable one.
+    """
+    match = RANGE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range.')
+    return start, end
+
+
+def make_file_etag(name, stat):
+    """Return a strong ETag for the stored file `name`."""
+    if CONTENT_ADDRESSED.search(name):
+        parts = name
+    else:
+        parts = f'{name}:{stat.st_size}:{stat.st_mtime_ns}'
+    return f'"{hashlib.sha256(parts.encode()).hexdigest()[:32]}"'
+
+
+def _offload(name, path):
+    """Return a response asking the proxy to send the file, or None."""
+    mode = settings.RECIPE_MEDIA_SENDFILE
+    if mode == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = quote(
+            settings.RECIPE_MEDIA_ACCEL_PREFIX + name
+        )
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    return None
+
+
+def _file_response(request, path, size, etag):
+    """Stream the file, honouring a single byte Range."""
+    if_range = request.headers.get('If-Range')
+    requested = request.headers.get('Range')
+    if if_range is not None and if_range != etag:
+        requested = None
+    try:
+        byte_range = parse_range(requested, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1))
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def media_response(request, name, path):
+    """Return the response serving the stored file `name` at `path`."""
+    stat = os.stat(path)
+    etag = make_file_etag(name, stat)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _offload(name, path) or _file_response(
+            request, path, stat.st_size, etag
+        )
+        content_type, encoding = mimetypes.guess_type(name)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED.search(name)
+        else REVALIDATE_CACHE_CONTROL
+    )
+    return response
@@ -0,0 +1,142 @@
+"""
+Pagination for the recipe APIs.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first.
+
+    Cursors encode the last seen id, so every page is an index range
+    scan and no total count is computed. Orderings of a field followed
+    by an id tiebreaker, such as search rank, encode both, so ties never
+    turn into offsets.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """Keep the ordering picked by the view, such as search rank."""
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = super()._get_position_from_instance(instance, ordering)
+        if len(ordering) == 1:
+            return position
+        return json.dumps([position, instance.pk])
+
+    def _filter_after(self, queryset, position, lookup):
+        """Return the rows after a cursor position in the page order."""
+        order_attr = self.ordering[0].lstrip('-')
+        if len(self.ordering) == 1:
+            return queryset.filter(**{f'{order_attr}__{lookup}': position})
+
+        tiebreak_attr = self.ordering[1].lstrip('-')
+        value, pk = json.loads(position)
+        return queryset.filter(
+            Q(**{f'{order_attr}__{lookup}': value})
+            | Q(**{order_attr: value, f'{tiebreak_attr}__{lookup}': pk})
+        )
+
+    def _page_queryset(self, queryset, request, view):
+        """Return the queryset of the page and one row past it, or None.
+
+        Split out of CursorPagination.paginate_queryset so the page can
+        be fetched with either ORM interface.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            is_reversed = self.ordering[0].startswith('-')
+
+            # Test for: (cursor reversed) XOR (queryset reversed)
+            lookup = 'lt' if self.cursor.reverse != is_reversed else 'gt'
+            try:
+                queryset = self._filter_after(
+                    queryset, current_position, lookup
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        self._position = (offset, reverse, current_position)
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _set_page(self, results):
+        """Keep the fetched page and work out the cursors around it."""
+        offset, reverse, current_position = self._position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ran in reverse, put the page back in order.
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self._page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self._set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async paginate_queryset, fetching the page with aiterator()."""
+        page = self._page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        results = [
+            obj async for obj in page.aiterator(chunk_size=self.page_size + 1)
+        ]
+        return self._set_page(results)
@@ -0,0 +1,66 @@
+"""
+Full-text search engines for recipes.
+
+Each engine filters a recipe queryset by the search terms and annotates
+it with a `rank`, higher meaning a better match.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+
+
+class PostgresSearchEngine:
+    """Search the trigger maintained, GIN indexed `search_vector`.
+
+    ts_rank returns a real, cast to double precision so the rank read
+    back into a pagination cursor compares equal to the stored one.
+    """
+
+    def search(self, queryset, terms):
+        query = SearchQuery(terms, search_type='websearch', config='english')
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+
+class SimpleSearchEngine:
+    """Portable engine matching every word in title or description.
+
+    Title matches rank above description matches, mirroring the weights
+    of the PostgreSQL search vector.
+    """
+
+    def search(self, queryset, terms):
+        matches = Q()
+        rank = Value(0)
+        for word in terms.split():
+            in_title = Q(title__icontains=word)
+            in_description = Q(description__icontains=word)
+            matches &= in_title | in_description
+            rank = rank + Case(
+                When(in_title, then=Value(2)),
+                When(in_description, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        return queryset.filter(matches).annotate(rank=rank)
+
+
+def get_search_engine():
+    """Return the configured engine, or the best one for the database."""
+    if settings.RECIPE_SEARCH_ENGINE:
+        return import_string(settings.RECIPE_SEARCH_ENGINE)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchEngine()
+    return SimpleSearchEngine()
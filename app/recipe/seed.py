@@ -0,0 +1,81 @@
+"""
+Synthetic recipe data for benchmarks.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def _chunks(items, size):
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def seed_recipes(
+    email,
+    recipes=1000,
+    tags=20,
+    ingredients=50,
+    links=3,
+    batch_size=5000,
+    seed=0,
+):
+    """Create a user owning a synthetic recipe dataset and return it.
+
+    Rows are written with bulk inserts. The dataset is only created
+    once per email, so repeated benchmark runs reuse it.
+    """
+    user, created = get_user_model().objects.get_or_create(email=email)
+    if not created and Recipe.objects.filter(user=user).exists():
+        return user
+
+    rng = random.Random(seed)
+    with transaction.atomic():
+        tag_objs = Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {i}') for i in range(tags)
+        ])
+        ingredient_objs = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {i}')
+            for i in range(ingredients)
+        ])
+
+        for start in range(0, recipes, batch_size):
+            count = min(batch_size, recipes - start)
+            recipe_objs = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=f'Recipe {start + i}',
+                    description='Lorem ipsum dolor sit amet. ' * 20,
+                    time_minutes=rng.randint(5, 240),
+                    price=Decimal(rng.randint(100, 99999)) / 100,
+                )
+                for i in range(count)
+            ])
+
+            tag_links = []
+            ingredient_links = []
+            for recipe in recipe_objs:
+                for tag in rng.sample(tag_objs, min(links, tags)):
+                    tag_links.append(
+                        Recipe.tags.through(recipe=recipe, tag=tag)
+                    )
+                for ingredient in rng.sample(
+                    ingredient_objs, min(links, ingredients)
+                ):
+                    ingredient_links.append(
+                        Recipe.ingredients.through(
+                            recipe=recipe, ingredient=ingredient
+                        )
+                    )
+
+            for chunk in _chunks(tag_links, batch_size):
+                Recipe.tags.through.objects.bulk_create(chunk)
+            for chunk in _chunks(ingredient_links, batch_size):
+                Recipe.ingredients.through.objects.bulk_create(chunk)
+
+    return user
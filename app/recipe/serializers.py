@@ -1,12 +1,51 @@
 """
 Serializer for Recipe API.
 """
+from django.utils.translation import gettext as _
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+
 from rest_framework import serializers
 
 from core.models import Recipe , Tag , Ingredient
+from recipe.bulk import resolve_names
+from recipe.images import (
+    DERIVATIVE_FORMATS,
+    DERIVATIVE_SIZES,
+    derivative_name,
+    derivatives_ready,
+)
+
+
+class UniqueNameMixin:
+    """Reject renaming an item to a name the user already has."""
+
+    def validate_name(self, value):
+        """Check the new name is free for the item's user."""
+        if self.instance is not None:
+            taken = type(self.instance).objects.filter(
+                user=self.instance.user_id,
+                name=value,
+            ).exclude(pk=self.instance.pk).exists()
+            if taken:
+                msg = _('An item with this name already exists.')
+                raise serializers.ValidationError(msg)
+        return value
+
+
+class SparseFieldsMixin:
+    """Limit a serializer to the field names passed as `fields`."""
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
 
-class TagSerializer(serializers.ModelSerializer):
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     """Serializer for Tags."""
 
     class Meta:
@@ -14,7 +53,8 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id','name']
         read_only_fields = ['id']
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -22,58 +62,90 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ['id','name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ['id','title','time_minutes','price','link','tags','ingredients']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'tags',
+            'ingredients', 'image_derivatives',
+        ]
         read_only_fields = ['id']
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_image_derivatives(self, obj):
+        """Return the resized image URLs by size and format.
+
+        Until the derivatives are stored, every entry is the original
+        image. Querysets annotated by `with_derivatives_ready` avoid a
+        query per recipe.
+        """
+        if not obj.image:
+            return None
+        ready = getattr(obj, 'image_derivatives_ready', None)
+        if ready is None:
+            ready = derivatives_ready(obj.image.name)
+        request = self.context.get('request')
+        derivatives = {}
+        for size in sorted(DERIVATIVE_SIZES):
+            derivatives[str(size)] = {}
+            for extension in DERIVATIVE_FORMATS:
+                name = obj.image.name
+                if ready:
+                    name = derivative_name(name, size, extension)
+                url = obj.image.storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                derivatives[str(size)][extension] = url
+        return derivatives
     
-    def _get_or_create_tags(self,tags,recipe):
+    def _get_or_create_tags(self, tags):
         """Handle getting or creating tags as needed."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj,created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        tag_objs = resolve_names(Tag, auth_user, (tag['name'] for tag in tags))
+        return list(tag_objs.values())
 
-    def _get_or_create_ingredients(self,ingredients,recipe):
+    def _get_or_create_ingredients(self, ingredients):
         """Handle getting or creating ingredients as needed."""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj , created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = resolve_names(
+            Ingredient,
+            auth_user,
+            (ingredient['name'] for ingredient in ingredients),
+        )
+        return list(ingredient_objs.values())
 
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients',[])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags,recipe)
-        self._get_or_create_ingredients(ingredients,recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
 
         return recipe
     
     def update(self,instance,validated_data):
-        """Update recipe."""
+        """Update recipe.
+
+        Tags and ingredients are diffed against the current membership,
+        so only links that changed are deleted or inserted.
+        """
         tags = validated_data.pop('tags',None)
         ingredients = validated_data.pop('ingredients',None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags,instance)
+            instance.tags.set(self._get_or_create_tags(tags))
         
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients,instance) 
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
         
         for attr,value in validated_data.items():
             setattr(instance,attr,value)
@@ -87,6 +159,26 @@ class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description','image']
 
+
+class RecipeBatchItemSerializer(RecipeDetailSerializer):
+    """Serializer for one recipe of a batch write."""
+
+    class Meta(RecipeDetailSerializer.Meta):
+        read_only_fields = ['id', 'image']
+
+
+class FacetCountSerializer(serializers.Serializer):
+    """Serializer for the recipe count of a tag or ingredient."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeFacetsSerializer(serializers.Serializer):
+    """Serializer for recipe counts per tag and ingredient."""
+    tags = FacetCountSerializer(many=True)
+    ingredients = FacetCountSerializer(many=True)
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading image to recipe."""
 
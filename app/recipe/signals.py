@@ -0,0 +1,141 @@
+"""
+Signal handlers keeping recipe timestamps, the response cache and image
+reference counts up to date.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_init,
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_version
+from recipe.images import release_image, retain_image
+
+# Marks a recipe loaded without its image column.
+UNKNOWN_IMAGE = object()
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_user_version(sender, instance, created, **kwargs):
+    """Start a new user from a fresh data version."""
+    if created:
+        bump_version(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_on_write(sender, instance, **kwargs):
+    """Invalidate the owner's cached responses on a write."""
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_on_membership_change(sender, instance, action, **kwargs):
+    """Invalidate the owner's cached responses when links change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
+
+
+def touch_recipes(recipes):
+    """Mark the given recipes as modified now."""
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_on_membership_change(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Update recipe timestamps when their tags or ingredients change."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.updated_at = timezone.now()
+            Recipe.objects.filter(pk=instance.pk).update(
+                updated_at=instance.updated_at
+            )
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_on_rename(sender, instance, created, **kwargs):
+    """Update timestamps of recipes showing a renamed tag or ingredient."""
+    if not created:
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_on_delete(sender, instance, **kwargs):
+    """Update timestamps of recipes losing a tag or ingredient."""
+    touch_recipes(instance.recipe_set.all())
+
+
+def _image_name(value):
+    """Return the stored name of an image field value, or None."""
+    return getattr(value, 'name', value) or None
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """Remember the image a recipe was loaded with."""
+    value = instance.__dict__.get('image', UNKNOWN_IMAGE)
+    instance._stored_image = (
+        value if value is UNKNOWN_IMAGE else _image_name(value)
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def load_stored_image(sender, instance, **kwargs):
+    """Read the stored image of a recipe whose image may have changed.
+
+    The remembered name can be missing or stale, such as after
+    refresh_from_db(), so a change is confirmed with the database.
+    """
+    if 'image' not in instance.__dict__ or instance._state.adding:
+        return
+    current = instance.image
+    if instance._stored_image == _image_name(current) and current._committed:
+        return
+    instance._stored_image = _image_name(
+        Recipe.objects.filter(pk=instance.pk).values_list(
+            'image', flat=True
+        ).first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_references(sender, instance, **kwargs):
+    """Move the image reference when a recipe's image changes."""
+    old = instance._stored_image
+    if old is UNKNOWN_IMAGE:
+        return
+    new = _image_name(instance.image)
+    if new != old:
+        if new:
+            retain_image(new)
+        if old:
+            release_image(old)
+        instance._stored_image = new
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Drop the image reference of a deleted recipe."""
+    name = instance.__dict__.get('image', instance._stored_image)
+    if name is not UNKNOWN_IMAGE and _image_name(name):
+        release_image(_image_name(name))
@@ -0,0 +1,141 @@
+"""
+Tests for the async recipe viewsets.
+"""
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Recipe, Tag
+from recipe.views import AsyncRecipeViewSet, AsyncTagViewSet
+
+recipe_list = AsyncRecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+recipe_detail = AsyncRecipeViewSet.as_view({'get': 'retrieve'})
+recipe_export = AsyncRecipeViewSet.as_view({'get': 'export'})
+tag_list = AsyncTagViewSet.as_view({'get': 'list'})
+
+
+@override_settings(RECIPE_RESPONSE_CACHE_TIMEOUT=0)
+class AsyncViewSetTests(TestCase):
+    """Test serving reads with the async ORM."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price=Decimal('1.00'),
+            )
+            for i in range(3)
+        ]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipes[0].tags.add(tag)
+
+    def _request(self, method='get', path='/', user=True, **kwargs):
+        """Return an optionally authenticated request."""
+        request = getattr(self.factory, method)(path, **kwargs)
+        if user:
+            force_authenticate(request, user=self.user)
+        return request
+
+    async def test_list_paginated(self):
+        """Test listing recipes a page at a time."""
+        res = await recipe_list(self._request(data={'page_size': 2}))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['title'] for r in res.data['results']],
+            ['Recipe 2', 'Recipe 1'],
+        )
+        self.assertIsNotNone(res.data['next'])
+
+    async def test_list_filtered(self):
+        """Test query filters apply to async lists."""
+        res = await recipe_list(self._request(data={'max_time_minutes': 0}))
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+    async def test_retrieve(self):
+        """Test retrieving a recipe with its related objects."""
+        recipe = self.recipes[0]
+
+        res = await recipe_detail(self._request(), pk=recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Recipe 0')
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+
+    async def test_retrieve_not_found(self):
+        """Test unknown and malformed ids are not found."""
+        for pk in (0, 'abc'):
+            res = await recipe_detail(self._request(), pk=pk)
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_not_modified(self):
+        """Test conditional GETs are answered without a body."""
+        res = await recipe_detail(self._request(), pk=self.recipes[0].id)
+
+        res = await recipe_detail(
+            self._request(HTTP_IF_NONE_MATCH=res['ETag']),
+            pk=self.recipes[0].id,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_auth_required(self):
+        """Test unauthenticated requests are rejected."""
+        res = await recipe_list(self._request(user=False))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_sync_action_runs_in_thread(self):
+        """Test write actions still work on an async viewset."""
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '2.00'}
+
+        res = await recipe_list(
+            self._request('post', data=payload, format='json')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            await Recipe.objects.filter(title='New').aexists()
+        )
+
+    async def test_tag_list(self):
+        """Test listing tags without pagination."""
+        res = await tag_list(self._request())
+
+        self.assertEqual([t['name'] for t in res.data], ['Vegan'])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_async(self):
+        """Test ASGI exports stream rows a chunk at a time."""
+        request = AsyncRequestFactory().get('/')
+        force_authenticate(request, user=self.user)
+
+        res = await recipe_export(request)
+
+        self.assertTrue(res.is_async)
+        rows = aiter(res.streaming_content)
+        # Queries run on the connection of the thread serving the test.
+        ctx = CaptureQueriesContext(connection)
+        await sync_to_async(ctx.__enter__)()
+        first = await anext(rows)
+        await sync_to_async(ctx.__exit__)(None, None, None)
+        # One chunk of recipes with its tags and ingredients.
+        self.assertEqual(await sync_to_async(len)(ctx), 3)
+        self.assertIn(b'Recipe 2', first)
+        self.assertEqual(len([first] + [row async for row in rows]), 3)
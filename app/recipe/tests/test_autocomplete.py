@@ -0,0 +1,159 @@
+"""
+Tests for tag and ingredient autocomplete.
+"""
+from functools import reduce
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.autocomplete import SortedNameIndex, next_row
+
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class SortedNameIndexTests(SimpleTestCase):
+    """Test the in-process sorted name index."""
+
+    def setUp(self):
+        self.index = SortedNameIndex([
+            (1, 'Olive oil'),
+            (2, 'Onion'),
+            (3, 'Oregano'),
+            (4, 'Red onion'),
+            (5, 'Tomato'),
+        ])
+
+    def _distance(self, a, b):
+        """Return the edit distance of a and b from next_row."""
+        return reduce(
+            lambda row, char: next_row(row, b, char),
+            a,
+            list(range(len(b) + 1)),
+        )[-1]
+
+    def test_edit_distance(self):
+        """Test distances are computed row by row."""
+        self.assertEqual(self._distance('tomato', 'tomato'), 0)
+        self.assertEqual(self._distance('tomtao', 'tomato'), 2)
+        self.assertEqual(self._distance('abc', 'xyz'), 3)
+
+    def test_prefix_matches_name_starts_first(self):
+        """Test whole name prefixes rank above word prefixes."""
+        names = [name for _, name in self.index.complete('on', 10)]
+
+        self.assertEqual(names, ['Onion', 'Red onion'])
+
+    def test_name_start_kept_within_limit(self):
+        """Test a whole name prefix is not cut off by word prefixes."""
+        names = [name for _, name in self.index.complete('on', 1)]
+
+        self.assertEqual(names, ['Onion'])
+
+    def test_limit(self):
+        """Test no more than limit matches are returned."""
+        self.assertEqual(len(self.index.complete('o', 2)), 2)
+
+    def test_typo_tolerant(self):
+        """Test a misspelled prefix still matches."""
+        names = [name for _, name in self.index.complete('oregna', 10)]
+
+        self.assertEqual(names, ['Oregano'])
+
+    def test_two_typos_in_long_term(self):
+        """Test terms of six letters or more allow two typos."""
+        names = [name for _, name in self.index.complete('tomtao', 10)]
+
+        self.assertEqual(names, ['Tomato'])
+
+    def test_typo_lookup_visits_near_names_only(self):
+        """Test typo lookups skip names far from the term."""
+        index = SortedNameIndex(
+            [(pk, f'Oat {pk:05d}') for pk in range(5000)]
+            + [(5000, 'Oregano')]
+        )
+
+        with patch(
+            'recipe.autocomplete.next_row', wraps=next_row
+        ) as patched_next_row:
+            names = [name for _, name in index.complete('oregna', 10)]
+
+        self.assertEqual(names, ['Oregano'])
+        self.assertLess(patched_next_row.call_count, 50)
+
+    def test_no_match(self):
+        """Test unrelated terms return nothing."""
+        self.assertEqual(self.index.complete('xyz', 10), [])
+
+
+class AutocompleteAPITests(TestCase):
+    """Test the autocomplete endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test autocomplete requires authentication."""
+        res = APIClient().get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tag_prefix(self):
+        """Test tags are matched by prefix for the user only."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        Tag.objects.create(user=other, name='Vegetarian')
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': vegan.id, 'name': 'Vegan'}])
+
+    @skipIf(connection.vendor == 'postgresql', 'Uses trigram matching.')
+    def test_ingredient_typo(self):
+        """Test ingredients are matched despite a typo."""
+        Ingredient.objects.create(user=self.user, name='Cinnamon')
+
+        res = self.client.get(INGREDIENT_AUTOCOMPLETE_URL, {'q': 'cinamon'})
+
+        self.assertEqual([i['name'] for i in res.data], ['Cinnamon'])
+
+    def test_index_refreshed_after_write(self):
+        """Test new names show up after being created."""
+        Tag.objects.create(user=self.user, name='Lunch')
+        self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'lu'})
+
+        Tag.objects.create(user=self.user, name='Luau')
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'lu'})
+
+        self.assertEqual(
+            sorted(t['name'] for t in res.data), ['Luau', 'Lunch']
+        )
+
+    def test_limit_and_empty_term(self):
+        """Test the limit is applied and an empty term returns nothing."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'tag', 'limit': 3})
+        self.assertEqual(len(res.data), 3)
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': ' '})
+        self.assertEqual(res.data, [])
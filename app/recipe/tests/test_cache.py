@@ -0,0 +1,248 @@
+"""
+Tests for the recipe API response cache.
+"""
+import tempfile
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import get_version
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail url."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test cached recipe API responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list request runs no query."""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_repeated_retrieve_served_from_cache(self):
+        """Test a repeated detail request only runs the validator query."""
+        recipe = create_recipe(user=self.user)
+        first = self.client.get(detail_url(recipe.id))
+
+        with self.assertNumQueries(1):
+            second = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(second.data, first.data)
+
+    def test_query_params_cached_separately(self):
+        """Test different query params get different entries."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        create_recipe(user=self.user, title='Other')
+
+        all_res = self.client.get(RECIPE_URL)
+        tag_res = self.client.get(RECIPE_URL, {'tags': tag.id})
+
+        self.assertEqual(len(all_res.data['results']), 2)
+        self.assertEqual(len(tag_res.data['results']), 1)
+
+    def test_recipe_write_invalidates(self):
+        """Test creating, updating and deleting a recipe invalidates."""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        create_recipe(user=self.user, title='New')
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        recipe.title = 'Renamed'
+        recipe.save()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.data['title'], 'Renamed')
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_membership_change_invalidates(self):
+        """Test adding and removing tags and ingredients invalidates."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(detail_url(recipe.id))
+
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+        tag.recipe_set.clear()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.data['tags'], [])
+
+    def test_tag_and_ingredient_lists_invalidate(self):
+        """Test tag and ingredient lists reflect writes."""
+        self.client.get(TAGS_URL)
+        self.client.get(INGREDIENTS_URL)
+
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+
+        self.assertEqual(len(self.client.get(TAGS_URL).data), 1)
+        self.assertEqual(len(self.client.get(INGREDIENTS_URL).data), 1)
+
+        tag.delete()
+        self.assertEqual(self.client.get(TAGS_URL).data, [])
+
+    def test_cache_limited_to_user(self):
+        """Test users never see each other's cached responses."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(RECIPE_RESPONSE_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test a zero timeout disables the cache."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(3):
+            self.client.get(RECIPE_URL)
+
+
+@override_settings(RECIPE_LOCAL_VERSION_TTL=5)
+class ProcessLocalVersionTests(TestCase):
+    """Test data versions in a per-process cache expire."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _later(self, seconds):
+        """Return a patch moving the cache clock `seconds` ahead."""
+        return patch('time.time', return_value=time.time() + seconds)
+
+    def test_version_expires(self):
+        """Test a version is replaced once its time to live passes."""
+        version = get_version(self.user.pk)
+
+        with self._later(4):
+            self.assertEqual(get_version(self.user.pk), version)
+        with self._later(6):
+            self.assertNotEqual(get_version(self.user.pk), version)
+
+    def test_write_by_other_worker_seen_after_ttl(self):
+        """Test a list is refreshed once a stale version expires.
+
+        Recipes are bulk created without signals, like a write another
+        worker handled and bumped its own version for.
+        """
+        etag = self.client.get(RECIPE_URL)['ETag']
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title='New', time_minutes=5,
+                   price=Decimal('1.00')),
+        ])
+
+        with self._later(6):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+
+class FileBasedResponseCacheTests(TestCase):
+    """Test the response cache on the file based backend."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(CACHES={
+            **settings.CACHES,
+            'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.cache_dir.name,
+            }
+        })
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.cache_dir.cleanup()
+
+    def test_cache_and_invalidate(self):
+        """Test responses are cached and invalidated on the file cache."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPE_URL)
+
+        create_recipe(user=self.user, title='New')
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_shared_version_does_not_expire(self):
+        """Test versions in a shared cache are kept until bumped."""
+        version = get_version(self.user.pk)
+
+        with patch('time.time', return_value=time.time() + 86400):
+            self.assertEqual(get_version(self.user.pk), version)
@@ -0,0 +1,95 @@
+"""
+Test recipe management commands.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe
+
+
+class BenchRecipeFiltersTest(TestCase):
+    """Test the recipe filter benchmark command."""
+
+    def test_bench_recipe_filters(self):
+        """Test benchmark seeds data and reports every plan."""
+        out = StringIO()
+
+        call_command(
+            'bench_recipe_filters',
+            recipes=50,
+            tags=5,
+            repeat=1,
+            stdout=out,
+        )
+
+        self.assertEqual(Recipe.objects.count(), 50)
+        output = out.getvalue()
+        self.assertIn('join + distinct (old)', output)
+        self.assertIn('exists, match any', output)
+        self.assertIn('grouped, match all', output)
+
+
+class BenchRecipeRangesTest(TestCase):
+    """Test the recipe range filter benchmark command."""
+
+    def test_bench_recipe_ranges(self):
+        """Test benchmark seeds data and reports every plan."""
+        out = StringIO()
+
+        call_command(
+            'bench_recipe_ranges',
+            recipes=50,
+            repeat=1,
+            stdout=out,
+        )
+
+        self.assertEqual(Recipe.objects.count(), 50)
+        output = out.getvalue()
+        self.assertIn('under 30 minutes and $10, cheapest first', output)
+        self.assertIn('all, slowest first (indexed)', output)
+        self.assertIn('Benchmark complete!', output)
+
+
+class BenchImageDerivativesTest(TestCase):
+    """Test the image derivative benchmark command."""
+
+    def test_bench_image_derivatives(self):
+        """Test benchmark reports throughput per worker count."""
+        out = StringIO()
+
+        call_command(
+            'bench_image_derivatives',
+            images=2,
+            width=300,
+            height=200,
+            workers='0',
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('inline:', output)
+        self.assertIn('images/s', output)
+
+
+class ExplainRecipeQueriesTest(TestCase):
+    """Test the query plan command."""
+
+    def test_explain_recipe_queries(self):
+        """Test every viewset scenario is explained."""
+        out = StringIO()
+
+        call_command(
+            'explain_recipe_queries',
+            recipes=20,
+            tags=5,
+            ingredients=5,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('recipe list by tags', output)
+        self.assertIn('recipe detail', output)
+        self.assertIn('ingredient list assigned only', output)
+        self.assertIn('Explain complete!', output)
@@ -0,0 +1,198 @@
+"""
+Tests for conditional GET on the recipe APIs.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail url."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeUpdatedAtTests(TestCase):
+    """Test tracking of recipe modification times."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.recipe = create_recipe(user=self.user)
+        self.past = timezone.now() - timedelta(days=1)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=self.past)
+
+    def assertTouched(self):
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, self.past)
+
+    def test_tag_added(self):
+        """Test adding a tag updates the recipe timestamp."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+
+        self.assertTouched()
+
+    def test_ingredient_removed_from_reverse_side(self):
+        """Test removing a recipe from an ingredient updates it."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe.ingredients.add(ingredient)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=self.past)
+
+        ingredient.recipe_set.clear()
+
+        self.assertTouched()
+
+    def test_tag_renamed(self):
+        """Test renaming a tag updates recipes showing it."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=self.past)
+
+        tag.name = 'Plant based'
+        tag.save()
+
+        self.assertTouched()
+
+    def test_tag_deleted(self):
+        """Test deleting a tag updates recipes showing it."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=self.past)
+
+        tag.delete()
+
+        self.assertTouched()
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_detail_validators(self):
+        """Test detail responses carry ETag and Last-Modified."""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(self.recipe.updated_at.timestamp()),
+        )
+
+    def test_detail_if_none_match(self):
+        """Test a matching ETag returns 304 without serializing."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_detail_changed_after_update(self):
+        """Test a stale ETag returns the full response."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='New'))
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['tags']), 1)
+
+    def test_detail_if_modified_since(self):
+        """Test If-Modified-Since returns 304 for an unchanged recipe."""
+        since = http_date(
+            (self.recipe.updated_at + timedelta(seconds=1)).timestamp()
+        )
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_MODIFIED_SINCE=since
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_if_none_match(self):
+        """Test the list returns 304 until a recipe changes."""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_changed_after_deleting_older_recipe(self):
+        """Test deleting a recipe other than the newest changes the list."""
+        create_recipe(user=self.user, title='Newer')
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        self.recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_validators_without_query(self):
+        """Test list validators are not aggregated from the recipes."""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_list_etag_depends_on_query(self):
+        """Test different filters produce different ETags."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        all_etag = self.client.get(RECIPE_URL)['ETag']
+        tag_etag = self.client.get(RECIPE_URL, {'tags': tag.id})['ETag']
+
+        self.assertNotEqual(all_etag, tag_etag)
+
+    def test_missing_recipe_not_found(self):
+        """Test a conditional GET of a missing recipe returns 404."""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,120 @@
+"""
+Tests for the recipe export API.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeExportTests(TestCase):
+    """Test streaming recipe exports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _content(self, res):
+        """Return the streamed body as text."""
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as one JSON document per line."""
+        recipe = create_recipe(user=self.user, title='Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice')
+        )
+        create_recipe(user=self.user, title='Salad')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Salad', 'Curry'])
+        self.assertEqual(rows[1]['price'], '5.25')
+        self.assertEqual(rows[1]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(rows[1]['ingredients'][0]['name'], 'Rice')
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with names joined in one cell."""
+        recipe = create_recipe(user=self.user, title='Curry')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Dinner'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry')
+        self.assertEqual(
+            sorted(rows[0]['tags'].split(';')), ['Dinner', 'Vegan']
+        )
+        self.assertEqual(rows[0]['image'], '')
+
+    def test_export_invalid_type(self):
+        """Test an unknown export format returns an error."""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_filtered_and_limited_to_user(self):
+        """Test only the user's recipes matching the filters are exported."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(user=other, title='Other')
+        create_recipe(user=self.user, title='Quick', time_minutes=10)
+        create_recipe(user=self.user, title='Slow', time_minutes=90)
+
+        res = self.client.get(EXPORT_URL, {'max_time_minutes': 30})
+
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Quick'])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_prefetches_per_chunk(self):
+        """Test tags and ingredients are fetched once per chunk."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Recipe {i}').tags.add(tag)
+
+        res = self.client.get(EXPORT_URL)
+        with self.assertNumQueries(7):
+            content = self._content(res)
+
+        self.assertEqual(len(content.splitlines()), 5)
@@ -0,0 +1,181 @@
+"""
+Tests for recipe image derivatives.
+"""
+import io
+import tempfile
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, StoredImage
+from recipe.images import derivative_name, render_derivatives
+
+
+def encode(image, image_format='JPEG', **options):
+    """Return the encoded bytes of image."""
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+class RenderDerivativesTests(SimpleTestCase):
+    """Test resizing and re-encoding images."""
+
+    def test_sizes_and_formats(self):
+        """Test every size is rendered as WebP and JPEG."""
+        rendered = render_derivatives(encode(Image.new('RGB', (3000, 1500))))
+
+        self.assertEqual(
+            sorted(rendered),
+            sorted((size, ext) for size in (128, 512, 1024)
+                   for ext in ('jpeg', 'webp')),
+        )
+        with Image.open(io.BytesIO(rendered[(128, 'webp')])) as img:
+            self.assertEqual(img.format, 'WEBP')
+            self.assertEqual(img.size, (128, 64))
+
+    def test_small_images_not_enlarged(self):
+        """Test images smaller than a size keep their size."""
+        rendered = render_derivatives(encode(Image.new('RGB', (300, 200))))
+
+        with Image.open(io.BytesIO(rendered[(1024, 'jpeg')])) as img:
+            self.assertEqual(img.size, (300, 200))
+
+    def test_jpeg_is_progressive(self):
+        """Test JPEG derivatives are progressive."""
+        rendered = render_derivatives(encode(Image.new('RGB', (600, 600))))
+
+        with Image.open(io.BytesIO(rendered[(512, 'jpeg')])) as img:
+            self.assertTrue(img.info.get('progressive'))
+
+    def test_exif_applied_and_stripped(self):
+        """Test EXIF orientation is applied and the metadata dropped."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees clockwise.
+        exif[0x010F] = 'Camera maker'
+        data = encode(Image.new('RGB', (800, 400)), exif=exif)
+
+        rendered = render_derivatives(data)
+
+        for content in rendered.values():
+            with Image.open(io.BytesIO(content)) as img:
+                self.assertNotIn('exif', img.info)
+                self.assertEqual(len(img.getexif()), 0)
+        with Image.open(io.BytesIO(rendered[(512, 'jpeg')])) as img:
+            self.assertEqual(img.size, (256, 512))
+
+    def test_transparency_flattened(self):
+        """Test transparent images are painted on white."""
+        image = Image.new('RGBA', (200, 200), (0, 0, 0, 0))
+
+        rendered = render_derivatives(encode(image, 'PNG'))
+
+        with Image.open(io.BytesIO(rendered[(128, 'jpeg')])) as img:
+            self.assertGreater(min(img.convert('L').getdata()), 240)
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class ImageReferenceTests(TestCase):
+    """Test stored images are shared and freed when unused."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _recipe(self):
+        """Create and return a sample recipe."""
+        return Recipe.objects.create(
+            user=self.user, title='Sample', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+
+    def _upload(self, recipe, color):
+        """Upload a solid colour image to recipe and return its name."""
+        image_file = io.BytesIO(encode(Image.new('RGB', (20, 20), color)))
+        image_file.name = 'photo.jpg'
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'image': image_file}, format='multipart')
+        recipe.refresh_from_db()
+        return recipe.image.name
+
+    def _refs(self, name):
+        """Return the reference count of a stored image."""
+        return StoredImage.objects.filter(name=name).values_list(
+            'ref_count', flat=True
+        ).first()
+
+    def test_same_image_shared(self):
+        """Test recipes uploading the same image share one file."""
+        first = self._upload(self._recipe(), 'red')
+        second = self._upload(self._recipe(), 'red')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self._refs(first), 2)
+
+    def test_file_kept_until_last_reference_goes(self):
+        """Test deleting recipes only frees the unreferenced image."""
+        r1, r2 = self._recipe(), self._recipe()
+        name = self._upload(r1, 'red')
+        self._upload(r2, 'red')
+        storage = r1.image.storage
+        thumbnail = derivative_name(name, 128, 'webp')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r1.delete()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self._refs(name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r2.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(thumbnail))
+        self.assertIsNone(self._refs(name))
+
+    def test_file_kept_for_save_after_release(self):
+        """Test a save finding the stored file keeps it from deletion."""
+        recipe = self._recipe()
+        name = self._upload(recipe, 'red')
+        storage = recipe.image.storage
+        with storage.open(name) as file:
+            content = file.read()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.delete()
+        # Saved before the last reference's files are deleted.
+        with transaction.atomic():
+            saved = storage.save('uploads/recipe/a.jpg', ContentFile(content))
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(saved, name)
+        self.assertTrue(storage.exists(name))
+
+    def test_replaced_image_freed(self):
+        """Test replacing an image frees the previous one."""
+        recipe = self._recipe()
+        old = self._upload(recipe, 'red')
+        new = self._upload(recipe, 'blue')
+
+        self.assertNotEqual(old, new)
+        self.assertFalse(recipe.image.storage.exists(old))
+        self.assertIsNone(self._refs(old))
+        self.assertEqual(self._refs(new), 1)
@@ -0,0 +1,188 @@
+"""
+Tests for the recipe media API.
+"""
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.images import derivative_name
+from recipe.media import parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    """Create and return a media url."""
+    return reverse('recipe:media', args=[name])
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Test parsing Range headers."""
+
+    def test_ranges(self):
+        """Test explicit, open ended and suffix ranges."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+
+    def test_whole_file(self):
+        """Test missing, malformed and multi-part ranges send everything."""
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('items=0-9', 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+
+    def test_unsatisfiable(self):
+        """Test ranges outside the file are rejected."""
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+
+
+class RecipeMediaTests(TestCase):
+    """Test serving recipe images."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.name = Recipe.image.field.storage.save(
+            'uploads/recipe/photo.jpg', ContentFile(CONTENT)
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample', time_minutes=5,
+            price=Decimal('1.00'), image=self.name,
+        )
+        self.url = media_url(self.name)
+
+    def _content(self, res):
+        """Return the streamed body."""
+        return b''.join(res.streaming_content)
+
+    def test_owner_gets_file(self):
+        """Test the owner receives the file with cache headers."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(res), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertTrue(res['ETag'].startswith('"'))
+
+    def test_serializer_links_to_media_view(self):
+        """Test image URLs on recipes point at the media view."""
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+        self.assertTrue(res.data['image'].endswith(self.url))
+
+    def test_other_user_not_found(self):
+        """Test other users cannot read the image."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_auth_required(self):
+        """Test anonymous requests are rejected."""
+        res = APIClient().get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_path_traversal_not_found(self):
+        """Test names escaping the media root are rejected."""
+        res = self.client.get(media_url('../secret.jpg'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_derivative_served_to_owner(self):
+        """Test derivatives are served to the owner of the source image."""
+        name = derivative_name(self.name, 128, 'webp')
+        default_storage.save(name, ContentFile(b'webp'))
+
+        res = self.client.get(media_url(name), HTTP_ACCEPT='image/webp')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(res), b'webp')
+        self.assertEqual(res['Content-Type'], 'image/webp')
+
+    def test_range_request(self):
+        """Test a byte range is answered with partial content."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self._content(res), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_stale_if_range_sends_whole_file(self):
+        """Test a range for an outdated copy returns the whole file."""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(res), CONTENT)
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is rejected."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_not_modified(self):
+        """Test a matching ETag returns 304 without a body."""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RECIPE_MEDIA_SENDFILE='x-accel-redirect')
+    def test_accel_redirect(self):
+        """Test the file is handed to nginx when configured."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['X-Accel-Redirect'], f'/protected-media/{self.name}'
+        )
+        self.assertEqual(res.content, b'')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(RECIPE_MEDIA_SENDFILE='x-sendfile')
+    def test_sendfile(self):
+        """Test the file path is handed to the server when configured."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(
+            res['X-Sendfile'], Recipe.image.field.storage.path(self.name)
+        )
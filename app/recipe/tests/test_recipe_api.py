@@ -2,22 +2,31 @@
 Tests for recipe apis.
 """
 from decimal import Decimal
+from unittest.mock import patch
 import tempfile
 import os
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe , Tag , Ingredient
+from core.tests.query_budget import QueryBudgetMixin
+from recipe import bulk
+from recipe.images import derivative_name, generate_derivatives
 from recipe.serializers import RecipeSerializer , RecipeDetailSerializer
+from recipe.views import RecipeViewSet
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BATCH_URL = reverse('recipe:recipe-batch')
+FACETS_URL = reverse('recipe:recipe-facets')
 
 
 def detail_url(recipe_id):
@@ -62,7 +71,7 @@ class PublicRecipeAPITests(TestCase):
     
 
 # For authenticated users tests.
-class PrivateRecipeAPITests(TestCase):
+class PrivateRecipeAPITests(QueryBudgetMixin, TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
@@ -82,7 +91,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes,many=True)
 
         self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
     
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is authenticated user."""
@@ -99,7 +108,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes,many=True)
 
         self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
     
     def test_get_recipe_detail(self):
         """Test get recipe details."""
@@ -383,6 +392,69 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code,status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(),0)
 
+    def test_create_recipe_many_ingredients_query_count(self):
+        """Test tags and ingredients are resolved with set queries."""
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+        payload = {
+            'title': 'Big Stew',
+            'time_minutes': 90,
+            'price': Decimal('9.00'),
+            'tags': [{'name': f'Tag {i}'} for i in range(5)],
+            'ingredients': [{'name': f'Ingredient {i}'} for i in range(20)],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(ctx), 20)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 5)
+        self.assertEqual(recipe.ingredients.count(), 20)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 20
+        )
+
+    def test_update_changes_only_modified_links(self):
+        """Test patching one ingredient only rewrites that link."""
+        recipe = create_recipe(user=self.user)
+        names = ['Salt', 'Pepper', 'Oil', 'Garlic', 'Onion']
+        recipe.ingredients.add(*[
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in names
+        ])
+        through = Recipe.ingredients.through
+        kept_rows = set(through.objects.filter(
+            recipe=recipe,
+        ).exclude(ingredient__name='Onion').values_list('id', flat=True))
+
+        payload = {
+            'ingredients': [{'name': name} for name in names[:4] + ['Leek']]
+        }
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        table = through._meta.db_table
+        through_writes = [
+            sql for sql in writes if table in sql.split('(')[0]
+        ]
+        self.assertEqual(len(through_writes), 2)
+        self.assertLessEqual(len(writes), 6)
+        rows = set(through.objects.filter(
+            recipe=recipe,
+        ).values_list('id', flat=True))
+        self.assertTrue(kept_rows <= rows)
+        self.assertEqual(
+            sorted(i.name for i in recipe.ingredients.all()),
+            sorted(names[:4] + ['Leek']),
+        )
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags."""
         r1 = create_recipe(user=self.user,title='Thai Vegetable Curry')
@@ -400,9 +472,9 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data,res.data)
-        self.assertIn(s2.data,res.data)
-        self.assertNotIn(s3.data,res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
     
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -421,15 +493,498 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data,res.data)
-        self.assertIn(s2.data,res.data)
-        self.assertNotIn(s3.data,res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
         
+    def test_filter_by_time_and_price_range(self):
+        """Test filtering recipes by time and price ranges."""
+        quick = create_recipe(
+            user=self.user, time_minutes=20, price=Decimal('8.00')
+        )
+        create_recipe(user=self.user, time_minutes=45, price=Decimal('8.00'))
+        create_recipe(user=self.user, time_minutes=20, price=Decimal('12.50'))
+        create_recipe(user=self.user, time_minutes=5, price=Decimal('2.00'))
+
+        params = {
+            'min_time_minutes': 10,
+            'max_time_minutes': 30,
+            'max_price': '10',
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [quick.id]
+        )
+
+    def test_filter_by_invalid_range(self):
+        """Test an invalid range bound returns an error."""
+        res = self.client.get(RECIPE_URL, {'min_price': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_price', res.data)
+
+    def test_sort_by_price_pages_in_order(self):
+        """Test sorting by price pages through every recipe in order."""
+        prices = ['3.00', '1.00', '2.00', '1.00', '5.00']
+        for price in prices:
+            create_recipe(user=self.user, price=Decimal(price))
+
+        seen = []
+        url = RECIPE_URL
+        params = {'ordering': 'price', 'page_size': 2}
+        while url:
+            res = self.client.get(url, params)
+            seen += [r['price'] for r in res.data['results']]
+            url, params = res.data['next'], None
+
+        self.assertEqual(seen, sorted(prices))
+
+    def test_sort_by_time_descending(self):
+        """Test sorting by time, slowest first."""
+        for minutes in (10, 60, 30):
+            create_recipe(user=self.user, time_minutes=minutes)
+
+        res = self.client.get(RECIPE_URL, {'ordering': '-time_minutes'})
+
+        self.assertEqual(
+            [r['time_minutes'] for r in res.data['results']], [60, 30, 10]
+        )
+
+    def test_filter_by_tags_no_duplicates(self):
+        """Test a recipe matching several tags is listed once."""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_by_tags_match_all(self):
+        """Test filtering recipes that have every requested tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1 = create_recipe(user=self.user, title='Lentil Dal')
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title='Salad')
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'tags_match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_by_ingredients_match_all(self):
+        """Test filtering recipes that have every requested ingredient."""
+        in1 = Ingredient.objects.create(user=self.user, name='Rice')
+        in2 = Ingredient.objects.create(user=self.user, name='Beans')
+        r1 = create_recipe(user=self.user, title='Rice and Beans')
+        r1.ingredients.add(in1, in2)
+        r2 = create_recipe(user=self.user, title='Fried Rice')
+        r2.ingredients.add(in1)
+
+        params = {
+            'ingredients': f'{in1.id},{in2.id}',
+            'ingredients_match': 'all',
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_list_within_query_budget(self):
+        """Test listing recipes runs a fixed number of queries."""
+        for i in range(10):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+        res = self.assertWithinQueryBudget(
+            RecipeViewSet, 'list', 'get', RECIPE_URL
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_retrieve_within_query_budget(self):
+        """Test retrieving a recipe runs a fixed number of queries."""
+        recipe = create_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+        res = self.assertWithinQueryBudget(
+            RecipeViewSet, 'retrieve', 'get', detail_url(recipe.id)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_list_sparse_fields(self):
+        """Test ?fields= limits the response and the query."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'title,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data['results'][0]), {'id', 'title', 'price'}
+        )
+        self.assertEqual(len(ctx), 1)
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"link"', sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_detail_omit_fields(self):
+        """Test ?omit= drops fields and their prefetches."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                detail_url(recipe.id), {'omit': 'description,tags,ingredients'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', res.data)
+        self.assertNotIn('tags', res.data)
+        self.assertEqual(res.data['title'], recipe.title)
+        self.assertEqual(len(ctx), 2)
+        self.assertFalse(any(
+            'core_recipe_tags' in q['sql'] for q in ctx.captured_queries
+        ))
+
+    def test_sparse_fields_ignore_unknown(self):
+        """Test unknown field names are ignored."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {'fields': 'title,user,nope'})
+
+        self.assertEqual(set(res.data['results'][0]), {'id', 'title'})
+
+    def test_list_paginated_by_cursor(self):
+        """Test recipes list is paginated with opaque cursors."""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [recipes[4].id, recipes[3].id])
+
+        seen = list(ids)
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen.extend(r['id'] for r in res.data['results'])
+            next_url = res.data['next']
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    def test_deep_page_within_query_budget(self):
+        """Test a later page costs the same queries as the first."""
+        for i in range(6):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        res = self.client.get(res.data['next'])
+
+        res = self.assertWithinQueryBudget(
+            RecipeViewSet, 'list', 'get', res.data['next']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+
+class ResolveNamesTests(TestCase):
+    """Test set based tag and ingredient resolution."""
+
+    def setUp(self):
+        self.user = create_user(email='example@gmail.com', password='pass123')
+
+    def test_resolve_creates_missing(self):
+        """Test existing rows are reused and missing ones created."""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+
+        found = bulk.resolve_names(Tag, self.user, ['Vegan', 'Lunch', 'Lunch'])
+
+        self.assertEqual(found['Vegan'], existing)
+        self.assertEqual(set(found), {'Vegan', 'Lunch'})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_resolve_concurrent_insert(self):
+        """Test a row created after the lookup is reused, not duplicated."""
+        real_by_name = bulk._by_name
+
+        def racing_by_name(model, user, names):
+            if not model.objects.filter(user=user, name='Vegan').exists():
+                model.objects.create(user=user, name='Vegan')
+                return {}
+            return real_by_name(model, user, names)
+
+        with patch('recipe.bulk._by_name', side_effect=racing_by_name):
+            found = bulk.resolve_names(Tag, self.user, ['Vegan'])
+
+        self.assertEqual(found['Vegan'].name, 'Vegan')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+
+class BatchRecipeAPITests(TestCase):
+    """Test the batch create/update API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='example@gmail.com', password='pass123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_create(self):
+        """Test creating several recipes with shared tags."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.00',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i}'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for item, result in zip(payload, res.data['results']):
+            self.assertEqual(result['status'], status.HTTP_201_CREATED)
+            recipe = Recipe.objects.get(id=result['data']['id'])
+            self.assertEqual(recipe.title, item['title'])
+            self.assertEqual(recipe.user, self.user)
+            self.assertEqual(
+                sorted(t.name for t in recipe.tags.all()),
+                sorted(t['name'] for t in item['tags']),
+            )
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_batch_query_count_constant(self):
+        """Test batch size does not change the number of write queries."""
+        def payload(count, offset):
+            return [
+                {
+                    'title': f'Recipe {offset + i}',
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    'tags': [{'name': f'Tag {offset + i}'}],
+                }
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BATCH_URL, payload(2, 0), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(BATCH_URL, payload(20, 100), format='json')
+
+        self.assertEqual(len(small), len(large))
+
+    def test_batch_update(self):
+        """Test updating recipes by id in a batch."""
+        r1 = create_recipe(user=self.user, title='Old 1')
+        r2 = create_recipe(user=self.user, title='Old 2')
+        r2.tags.add(Tag.objects.create(user=self.user, name='Lunch'))
+        payload = [
+            {'id': r1.id, 'title': 'New 1'},
+            {'id': r2.id, 'tags': [{'name': 'Dinner'}]},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.title, 'New 1')
+        self.assertEqual(r2.title, 'Old 2')
+        self.assertEqual([t.name for t in r2.tags.all()], ['Dinner'])
+        self.assertEqual(
+            [r['status'] for r in res.data['results']],
+            [status.HTTP_200_OK, status.HTTP_200_OK],
+        )
+
+    def test_batch_update_keeps_unchanged_links(self):
+        """Test a batch update only rewrites links that changed."""
+        recipe = create_recipe(user=self.user)
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+        recipe.tags.add(lunch, Tag.objects.create(user=self.user, name='Old'))
+        kept = Recipe.tags.through.objects.get(recipe=recipe, tag=lunch).id
+        payload = [
+            {'id': recipe.id, 'tags': [{'name': 'Lunch'}, {'name': 'New'}]},
+        ]
+
+        self.client.post(BATCH_URL, payload, format='json')
+
+        rows = Recipe.tags.through.objects.filter(recipe=recipe)
+        self.assertEqual(
+            sorted(row.tag.name for row in rows), ['Lunch', 'New']
+        )
+        self.assertTrue(rows.filter(id=kept).exists())
+
+    def test_batch_per_item_errors(self):
+        """Test invalid items are reported and valid ones are saved."""
+        other = create_user(email='other@gmail.com', password='pass123')
+        other_recipe = create_recipe(user=other)
+        payload = [
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'Missing fields'},
+            {'id': other_recipe.id, 'title': 'Not mine'},
+            'not an object',
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], status.HTTP_201_CREATED)
+        self.assertIn('time_minutes', results[1]['errors'])
+        self.assertIn('id', results[2]['errors'])
+        self.assertIn('non_field_errors', results[3]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+        other_recipe.refresh_from_db()
+        self.assertNotEqual(other_recipe.title, 'Not mine')
+
+    def test_batch_requires_list(self):
+        """Test a non list body is rejected."""
+        res = self.client.post(BATCH_URL, {'title': 'x'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_BATCH_MAX_SIZE=2)
+    def test_batch_size_limited(self):
+        """Test batches over the size limit are rejected."""
+        payload = [{'title': 'x', 'time_minutes': 1, 'price': '1.00'}] * 3
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_batch_invalidates_cache(self):
+        """Test a batch write shows up in a cached list."""
+        self.client.get(RECIPE_URL)
+        payload = [{'title': 'x', 'time_minutes': 1, 'price': '1.00'}]
+
+        self.client.post(BATCH_URL, payload, format='json')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+
+class FacetsAPITests(TestCase):
+    """Test the recipe facet counts API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='example@gmail.com', password='pass123')
+        self.client.force_authenticate(user=self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user, title='Curry')
+        r1.tags.add(self.vegan, self.dinner)
+        r1.ingredients.add(self.rice)
+        r2 = create_recipe(user=self.user, title='Salad')
+        r2.tags.add(self.vegan)
+        create_recipe(user=self.user, title='Toast')
+
+    def test_facet_counts(self):
+        """Test counts per tag and ingredient in one query each."""
+        with self.assertNumQueries(2):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [
+            {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+            {'id': self.dinner.id, 'name': 'Dinner', 'count': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': self.rice.id, 'name': 'Rice', 'count': 1},
+        ])
+
+    def test_facets_respect_filters(self):
+        """Test counts only include recipes matching the filters."""
+        res = self.client.get(FACETS_URL, {'tags': self.dinner.id})
+
+        self.assertEqual(
+            [(t['name'], t['count']) for t in res.data['tags']],
+            [('Dinner', 1), ('Vegan', 1)],
+        )
+
+        res = self.client.get(FACETS_URL, {'search': 'salad'})
+
+        self.assertEqual(
+            [(t['name'], t['count']) for t in res.data['tags']],
+            [('Vegan', 1)],
+        )
+        self.assertEqual(res.data['ingredients'], [])
+
+    def test_facets_limited_to_user(self):
+        """Test other users' recipes are not counted."""
+        other = create_user(email='other@gmail.com', password='pass123')
+        tag = Tag.objects.create(user=other, name='Vegan')
+        create_recipe(user=other).tags.add(tag)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['tags'][0]['count'], 2)
+
+    def test_facets_cached_and_invalidated(self):
+        """Test facet counts are cached until a recipe changes."""
+        self.client.get(FACETS_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(FACETS_URL)
+
+        create_recipe(user=self.user).tags.add(self.dinner)
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(
+            [(t['name'], t['count']) for t in res.data['tags']],
+            [('Dinner', 2), ('Vegan', 2)],
+        )
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
 
     def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'user@example.com',
@@ -456,6 +1011,72 @@ class ImageUploadTests(TestCase):
             self.assertIn('image',res.data)
             self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_upload_image_generates_derivatives(self):
+        """Test resized images are generated after upload and exposed."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (2000, 1000)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    url, {'image': image_file}, format='multipart'
+                )
+
+        self.recipe.refresh_from_db()
+        name = derivative_name(self.recipe.image.name, 512, 'webp')
+        with Image.open(self.recipe.image.storage.path(name)) as img:
+            self.assertEqual(img.size, (512, 256))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(
+            res.data['image_derivatives']['512']['webp'].endswith(name)
+        )
+        self.assertEqual(
+            set(res.data['image_derivatives']), {'128', '512', '1024'}
+        )
+
+    @patch('recipe.views.schedule_derivatives')
+    def test_pending_derivatives_use_original_image(self, patched_schedule):
+        """Test the original image is exposed until derivatives exist."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (300, 200)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            self.client.post(url, {'image': image_file}, format='multipart')
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        res = self.client.get(detail_url(self.recipe.id))
+        listed = self.client.get(RECIPE_URL)
+
+        for derivatives in (
+            res.data['image_derivatives'],
+            listed.data['results'][0]['image_derivatives'],
+        ):
+            self.assertEqual(set(derivatives), {'128', '512', '1024'})
+            for urls in derivatives.values():
+                for url in urls.values():
+                    self.assertTrue(url.endswith(name))
+
+        generate_derivatives(name)
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        listed = self.client.get(RECIPE_URL)
+
+        expected = derivative_name(name, 512, 'webp')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            res.data['image_derivatives']['512']['webp'].endswith(expected)
+        )
+        self.assertTrue(
+            listed.data['results'][0]['image_derivatives']['512'][
+                'webp'
+            ].endswith(expected)
+        )
+
     def test_upload_image_bad_request(self):
         """Test uploading invalid image."""
         url = image_upload_url(self.recipe.id)
@@ -0,0 +1,188 @@
+"""
+Tests for recipe search.
+"""
+import base64
+from decimal import Decimal
+from unittest import skipIf
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.search import (
+    PostgresSearchEngine,
+    SimpleSearchEngine,
+    get_search_engine,
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def decode_cursor(url):
+    """Return the decoded tokens of the cursor in a page link."""
+    cursor = parse_qs(urlparse(url).query)['cursor'][0]
+    return parse_qs(base64.b64decode(cursor).decode())
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SearchEngineTests(TestCase):
+    """Test search engine selection and query building."""
+
+    @skipIf(connection.vendor == 'postgresql', 'Uses full-text search.')
+    def test_portable_engine_off_postgres(self):
+        """Test the portable engine is used on other databases."""
+        self.assertIsInstance(get_search_engine(), SimpleSearchEngine)
+
+    @override_settings(
+        RECIPE_SEARCH_ENGINE='recipe.search.PostgresSearchEngine'
+    )
+    def test_engine_setting(self):
+        """Test the engine can be chosen in settings."""
+        self.assertIsInstance(get_search_engine(), PostgresSearchEngine)
+
+    def test_postgres_engine_query(self):
+        """Test the PostgreSQL engine matches the search vector."""
+        queryset = PostgresSearchEngine().search(
+            Recipe.objects.all(), 'curry'
+        )
+
+        sql = str(queryset.query)
+        self.assertIn('websearch_to_tsquery', sql)
+        self.assertIn('ts_rank', sql)
+        self.assertIn('search_vector', sql)
+
+
+class RecipeSearchAPITests(TestCase):
+    """Test the ?search= parameter of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_search_ranks_title_first(self):
+        """Test title matches rank above description matches."""
+        in_description = create_recipe(
+            user=self.user,
+            title='Rice bowl',
+            description='Serve with a mild curry sauce',
+        )
+        in_title = create_recipe(user=self.user, title='Green curry')
+        create_recipe(user=self.user, title='Pancakes')
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+
+    def test_search_requires_every_word(self):
+        """Test every search word must match."""
+        match = create_recipe(user=self.user, title='Thai green curry')
+        create_recipe(user=self.user, title='Thai noodles')
+
+        res = self.client.get(RECIPE_URL, {'search': 'thai curry'})
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [match.id])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the user's recipes."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_recipe(user=other, title='Curry')
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_with_tag_filter(self):
+        """Test search combines with the tag filter in one query."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        match = create_recipe(user=self.user, title='Vegan curry')
+        match.tags.add(tag)
+        create_recipe(user=self.user, title='Chicken curry')
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPE_URL, {'search': 'curry', 'tags': tag.id}
+            )
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [match.id])
+
+    def test_search_paginates_by_rank(self):
+        """Test ranked results page through without gaps or repeats."""
+        expected = []
+        for i in range(3):
+            expected.append(
+                create_recipe(user=self.user, title=f'Curry {i}').id
+            )
+        for i in range(3):
+            expected.append(create_recipe(
+                user=self.user,
+                title=f'Bowl {i}',
+                description='with curry',
+            ).id)
+        expected = expected[2::-1] + expected[:2:-1]
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(seen, expected)
+
+    def test_search_cursor_keys_rank_and_id(self):
+        """Test pages split inside a rank tie without offsets."""
+        ids = [
+            create_recipe(user=self.user, title=f'Curry {i}').id
+            for i in range(5)
+        ]
+        expected = ids[::-1]
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        pages = [[r['id'] for r in res.data['results']]]
+        while res.data['next']:
+            self.assertNotIn('o', decode_cursor(res.data['next']))
+            res = self.client.get(res.data['next'])
+            pages.append([r['id'] for r in res.data['results']])
+        previous = self.client.get(res.data['previous'])
+
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(
+            [r['id'] for r in previous.data['results']], pages[-2]
+        )
+
+    def test_search_invalid_cursor(self):
+        """Test a tampered cursor position is not found."""
+        create_recipe(user=self.user, title='Curry')
+        cursor = base64.b64encode(b'p=not-json').decode()
+
+        res = self.client.get(
+            RECIPE_URL, {'search': 'curry', 'cursor': cursor}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
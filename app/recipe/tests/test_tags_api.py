@@ -83,6 +83,19 @@ class PrivateTagsApiTest(TestCase):
         
         self.assertEqual(tag.name,payload['name'])
     
+    def test_update_tag_name_taken(self):
+        """Test renaming a tag to an existing name fails."""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='After Dinner')
+
+        payload = {'name': 'Dessert'}
+        url = detail_url(tag.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'After Dinner')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user,name='BreakFast')
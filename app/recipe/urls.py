@@ -1,6 +1,7 @@
 """
 URL mapping for the recipe app.
 """
+from django.conf import settings
 from django.urls import path , include
 
 from rest_framework.routers import DefaultRouter
@@ -8,12 +9,18 @@ from rest_framework.routers import DefaultRouter
 from recipe import views
 
 router = DefaultRouter()
-router.register('recipes',views.RecipeViewSet)
-router.register('tags',views.TagViewSet)
-router.register('ingredients',views.IngredientViewSet)
+if settings.RECIPE_ASYNC_VIEWS:
+    router.register('recipes', views.AsyncRecipeViewSet)
+    router.register('tags', views.AsyncTagViewSet)
+    router.register('ingredients', views.AsyncIngredientViewSet)
+else:
+    router.register('recipes', views.RecipeViewSet)
+    router.register('tags', views.TagViewSet)
+    router.register('ingredients', views.IngredientViewSet)
 
 app_name = 'recipe'
 
 urlpatterns = [
     path('',include(router.urls)),
+    path('media/<path:name>', views.RecipeMediaView.as_view(), name='media'),
 ]
\ No newline at end of file
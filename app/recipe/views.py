@@ -8,59 +8,293 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
-from rest_framework import viewsets , mixins , status
-from rest_framework.authentication import TokenAuthentication
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
+
+from rest_framework import viewsets, mixins, status, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.views import APIView
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
 from core.models import Recipe, Tag , Ingredient
+from recipe.asynchronous import (
+    AsyncListModelMixin,
+    AsyncRetrieveModelMixin,
+    AsyncViewSetMixin,
+)
+from recipe.autocomplete import get_autocomplete_engine
+from recipe.bulk import bulk_save_recipes
+from recipe.cache import (
+    AsyncCachedListMixin,
+    AsyncCachedRetrieveMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+)
+from recipe.conditional import AsyncConditionalGetMixin, ConditionalGetMixin
+from recipe.export import (
+    EXPORT_FORMATS,
+    aiter_recipes,
+    arender_rows,
+    iter_recipes,
+    render_rows,
+)
+from recipe.filters import facet_counts, filter_by_range, filter_by_related
+from recipe.images import (
+    image_lookup,
+    schedule_derivatives,
+    with_derivatives_ready,
+)
+from recipe.media import media_response
+from recipe.pagination import RecipeCursorPagination
+from recipe.search import get_search_engine
 from recipe.serializers import (
-    RecipeSerializer , RecipeDetailSerializer , 
-    TagSerializer, IngredientSerializer , RecipeImageSerializer)
+    RecipeSerializer, RecipeDetailSerializer, RecipeBatchItemSerializer,
+    RecipeFacetsSerializer, TagSerializer, IngredientSerializer,
+    RecipeImageSerializer)
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+RECIPE_RANGE_FIELDS = {
+    'time_minutes': serializers.IntegerField(),
+    'price': serializers.DecimalField(max_digits=None, decimal_places=None),
+}
+RECIPE_ORDERING_FIELDS = tuple(RECIPE_RANGE_FIELDS)
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return',
+    ),
+    OpenApiParameter(
+        'omit',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out',
+    ),
+]
+
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='Search terms matched against title and '
+                    'description, results are ranked',
+    ),
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of IDs to filter',
+    ),
+    OpenApiParameter(
+        'tags_match',
+        OpenApiTypes.STR,
+        enum=['any', 'all'],
+        description='Match recipes with any (default) or all tags.',
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Comma separated list of IDs to filter',
+    ),
+    OpenApiParameter(
+        'ingredients_match',
+        OpenApiTypes.STR,
+        enum=['any', 'all'],
+        description='Match recipes with any (default) or all '
+                    'ingredients.',
+    ),
+    OpenApiParameter(
+        'min_time_minutes',
+        OpenApiTypes.INT,
+        description='Only recipes taking at least this many minutes.',
+    ),
+    OpenApiParameter(
+        'max_time_minutes',
+        OpenApiTypes.INT,
+        description='Only recipes taking at most this many minutes.',
+    ),
+    OpenApiParameter(
+        'min_price',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at least this much.',
+    ),
+    OpenApiParameter(
+        'max_price',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at most this much.',
+    ),
+]
 
-@extend_schema_view(
+RECIPE_ORDERING_PARAMETERS = [
+    OpenApiParameter(
+        'ordering',
+        OpenApiTypes.STR,
+        enum=[
+            prefix + field
+            for field in RECIPE_ORDERING_FIELDS
+            for prefix in ('', '-')
+        ],
+        description='Sort by a field, prefix with - for descending. '
+                    'Defaults to newest first, or best match when '
+                    'searching.',
+    ),
+]
+
+# Shared by the sync and async viewsets, which override list/retrieve.
+recipe_schema = extend_schema_view(
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
     list=extend_schema(
-        parameters = [
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma separated list of IDs to filter',
-            ),
+        parameters=SPARSE_FIELDS_PARAMETERS + RECIPE_FILTER_PARAMETERS
+        + RECIPE_ORDERING_PARAMETERS
+    )
+)
+
+recipe_attr_schema = extend_schema_view(
+    list=extend_schema(
+        parameters=[
             OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='Comma separated list of IDs to filter',
+                'assigned_only',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Filter by items assigned to recipes.'
             )
         ]
     )
 )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+@recipe_schema
+class RecipeViewSet(
+    ConditionalGetMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet,
+):
     """View for manage recipe APIs. """
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    query_budget = {'list': 4, 'retrieve': 4}
+    sparse_actions = ('list', 'retrieve')
+    # Model columns read by serializer fields that are not columns.
+    field_columns = {'image_derivatives': 'image'}
 
     def _params_to_ints(self,qs):
         """Convert a list of string to integers."""
         return [int(str_id) for str_id in qs.split(',')] 
 
+    def _range_param(self, name, field):
+        """Return a range bound from the query params, or None."""
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return field.to_internal_value(value)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({name: exc.detail})
+
+    def _filter_ranges(self, queryset):
+        """Apply the min_/max_ filters on time_minutes and price."""
+        for name, field in RECIPE_RANGE_FIELDS.items():
+            queryset = filter_by_range(
+                queryset,
+                name,
+                low=self._range_param(f'min_{name}', field),
+                high=self._range_param(f'max_{name}', field),
+            )
+        return queryset
+
+    def _ordering(self, search):
+        """Return the order_by fields for the requested sort.
+
+        Ties are broken by id in the same direction, so the per-user
+        composite indexes serve the sort in either direction.
+        """
+        ordering = self.request.query_params.get('ordering', '')
+        if ordering.lstrip('-') in RECIPE_ORDERING_FIELDS:
+            descending = ordering.startswith('-')
+            return (ordering, '-id' if descending else 'id')
+        if search:
+            return ('-rank', '-id')
+        return ('-id',)
+
     def get_queryset(self):
         """retrieve recipes for authenticated user."""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
+        tags = params.get('tags')
+        ingredients = params.get('ingredients')
         queryset = self.queryset
 
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filter_by_related(
+                queryset, 'tags', tag_ids,
+                match_all=params.get('tags_match') == 'all',
+            )
 
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filter_by_related(
+                queryset, 'ingredients', ingredient_ids,
+                match_all=params.get('ingredients_match') == 'all',
+            )
+
+        queryset = self._filter_ranges(
+            queryset.filter(user=self.request.user)
+        )
+        search = params.get('search', '').strip()
+        if search:
+            queryset = get_search_engine().search(queryset, search)
+        queryset = queryset.order_by(*self._ordering(search))
+
+        if self.action in self.sparse_actions:
+            fields = self._selected_fields()
+            related = [f for f in ('tags', 'ingredients') if f in fields]
+            columns = [
+                self.field_columns.get(f, f)
+                for f in fields if f not in related
+            ]
+            queryset = queryset.only(*columns).prefetch_related(*related)
+            if 'image_derivatives' in fields:
+                queryset = with_derivatives_ready(queryset)
+            return queryset
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        return with_derivatives_ready(
+            queryset.prefetch_related('tags', 'ingredients')
+        )
+
+    def _selected_fields(self):
+        """Return the serializer fields picked with ?fields= and ?omit=."""
+        params = self.request.query_params
+        available = self.get_serializer_class().Meta.fields
+        fields = params.get('fields')
+        selected = set(fields.split(',')) if fields else set(available)
+        selected -= set(params.get('omit', '').split(','))
+
+        return ['id'] + [
+            name for name in available
+            if name in selected and name != 'id'
+        ]
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, limited to the selected fields."""
+        if self.action in self.sparse_actions:
+            kwargs.setdefault('fields', self._selected_fields())
+        return super().get_serializer(*args, **kwargs)
     
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -68,6 +302,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'batch':
+            return RecipeBatchItemSerializer
+        elif self.action == 'facets':
+            return RecipeFacetsSerializer
         
         return self.serializer_class
     
@@ -82,30 +320,172 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe,data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            # Holds the stored image lock until the reference is counted.
+            with transaction.atomic():
+                recipe = serializer.save()
+            name = recipe.image.name
+            transaction.on_commit(lambda: schedule_derivatives(name))
             return Response(serializer.data,status=status.HTTP_200_OK)
         
         return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
 
-@extend_schema_view(
-    list=extend_schema(
-        parameters=[
+    def _facets(self, request):
+        """Build the facet counts for the filtered recipes."""
+        recipes = self.get_queryset().prefetch_related(None).order_by()
+        serializer = self.get_serializer({
+            'tags': facet_counts(recipes, 'tags'),
+            'ingredients': facet_counts(recipes, 'ingredients'),
+        })
+        return Response(serializer.data)
+
+    @extend_schema(parameters=RECIPE_FILTER_PARAMETERS)
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """Return recipe counts per tag and ingredient."""
+        return self._cached_response(self._facets, request)
+
+    @extend_schema(
+        parameters=RECIPE_FILTER_PARAMETERS + RECIPE_ORDERING_PARAMETERS + [
             OpenApiParameter(
-                'assigned_only',
-                OpenApiTypes.INT,enum=[0,1],
-                description='Filter by items assigned to recipes.'
-            )
-        ]
+                'type',
+                OpenApiTypes.STR,
+                enum=list(EXPORT_FORMATS),
+                description='Export file format, ndjson by default.',
+            ),
+        ],
+        responses={(200, media_type): OpenApiTypes.BINARY
+                   for media_type, *_ in EXPORT_FORMATS.values()},
     )
-)
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream every matching recipe as NDJSON or CSV."""
+        export_format = request.query_params.get('type', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'type': [f'Expected one of {", ".join(EXPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        recipes, render = iter_recipes, render_rows
+        # Under ASGI a sync iterator would be read into memory in full
+        # before the first byte is sent.
+        if isinstance(request._request, ASGIRequest):
+            recipes, render = aiter_recipes, arender_rows
+        rows = render(export_format, recipes(
+            self.get_queryset(),
+            settings.RECIPE_EXPORT_CHUNK_SIZE,
+            context=self.get_serializer_context(),
+        ))
+        response = StreamingHttpResponse(
+            rows, content_type=EXPORT_FORMATS[export_format][0]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    def _batch_item_serializer(self, item, instances, seen):
+        """Return a serializer for a batch item or a list of errors."""
+        if not isinstance(item, dict):
+            return None, {'non_field_errors': ['Expected a recipe object.']}
+
+        if item.get('id') is None:
+            return self.get_serializer(data=item), None
+
+        try:
+            pk = int(item['id'])
+        except (TypeError, ValueError):
+            return None, {'id': ['A valid integer is required.']}
+        if pk in seen:
+            return None, {'id': ['Duplicate recipe in batch.']}
+        if pk not in instances:
+            return None, {'id': ['Not found.']}
+
+        seen.add(pk)
+        serializer = self.get_serializer(
+            instances[pk], data=item, partial=True
+        )
+        return serializer, None
+
+    @extend_schema(request=RecipeBatchItemSerializer(many=True))
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch(self, request):
+        """Create or update a list of recipes in one transaction."""
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Expected a list of recipes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.RECIPE_BATCH_MAX_SIZE:
+            return Response(
+                {'detail': 'Batch is limited to '
+                           f'{settings.RECIPE_BATCH_MAX_SIZE} recipes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = []
+        for item in items:
+            try:
+                ids.append(int(item['id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        instances = self.queryset.filter(user=request.user).in_bulk(ids)
+
+        results = [None] * len(items)
+        creates, updates = [], []
+        seen = set()
+        for index, item in enumerate(items):
+            serializer, errors = self._batch_item_serializer(
+                item, instances, seen
+            )
+            if errors is None and not serializer.is_valid():
+                errors = serializer.errors
+            if errors is not None:
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': errors,
+                }
+            elif serializer.instance is None:
+                creates.append((index, serializer.validated_data))
+            else:
+                updates.append(
+                    (index, (serializer.instance, serializer.validated_data))
+                )
+
+        saved = bulk_save_recipes(
+            request.user,
+            [data for _, data in creates],
+            [pair for _, pair in updates],
+        )
+        recipes = self.queryset.filter(
+            pk__in=[recipe.pk for recipe in saved]
+        ).prefetch_related('tags', 'ingredients').in_bulk()
+        written = [(index, status.HTTP_201_CREATED) for index, _ in creates]
+        written += [(index, status.HTTP_200_OK) for index, _ in updates]
+        for (index, code), recipe in zip(written, saved):
+            results[index] = {
+                'status': code,
+                'data': self.get_serializer(recipes[recipe.pk]).data,
+            }
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+@recipe_attr_schema
 class BaseRecipeAttrViewSet(
+    CachedListMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,         
     mixins.ListModelMixin, 
     viewsets.GenericViewSet):
     """Base viewset for recipe attribute"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    query_budget = {'list': 1}
 
     def get_queryset(self):
         """Filter queryset for authenticated user."""
@@ -114,11 +494,48 @@ class BaseRecipeAttrViewSet(
             )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            model = queryset.model
+            through = model.recipe_set.through
+            queryset = queryset.filter(Exists(through.objects.filter(
+                **{model._meta.model_name: OuterRef('pk')}
+            )))
         
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Start of the name, typos are tolerated.',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description=f'Number of matches, at most '
+                            f'{AUTOCOMPLETE_MAX_LIMIT}.',
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the best matching names for a prefix."""
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        if not term:
+            return Response([])
+
+        matches = get_autocomplete_engine().complete(
+            self.queryset.model, request.user, term, limit
+        )
+        serializer = self.get_serializer(matches, many=True)
+        return Response(serializer.data)
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
@@ -128,4 +545,68 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     serializer_class = IngredientSerializer
-    queryset = Ingredient.objects.all()
\ No newline at end of file
+    queryset = Ingredient.objects.all()
+
+
+# The async viewsets read with the async ORM, for ASGI servers. Their
+# docstrings describe the API in the schema, so they keep the sync ones.
+@recipe_schema
+class AsyncRecipeViewSet(
+    AsyncViewSetMixin,
+    AsyncConditionalGetMixin,
+    AsyncCachedListMixin,
+    AsyncCachedRetrieveMixin,
+    AsyncListModelMixin,
+    AsyncRetrieveModelMixin,
+    RecipeViewSet,
+):
+    __doc__ = RecipeViewSet.__doc__
+
+
+@recipe_attr_schema
+class AsyncTagViewSet(
+    AsyncViewSetMixin,
+    AsyncCachedListMixin,
+    AsyncListModelMixin,
+    TagViewSet,
+):
+    __doc__ = TagViewSet.__doc__
+
+
+@recipe_attr_schema
+class AsyncIngredientViewSet(
+    AsyncViewSetMixin,
+    AsyncCachedListMixin,
+    AsyncListModelMixin,
+    IngredientViewSet,
+):
+    __doc__ = IngredientViewSet.__doc__
+
+
+class RecipeMediaView(APIView):
+    """Serve recipe images and their derivatives to their owner."""
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        """Accept any media type, files are not rendered."""
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(responses={(200, '*/*'): OpenApiTypes.BINARY})
+    def get(self, request, name):
+        """Return the file if one of the user's recipes uses it."""
+        owned = Recipe.objects.filter(user=request.user).filter(
+            image_lookup(name)
+        ).exists()
+        if not owned:
+            raise Http404
+        try:
+            path = Recipe.image.field.storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        if not os.path.isfile(path):
+            raise Http404
+        return media_response(request, name, path)
@@ -1,11 +1,15 @@
 """
 Serializers for the API view.
 """
+from django.conf import settings
 from django.contrib.auth import get_user_model , authenticate 
+from django.core import signing
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core.authentication import REFRESH_TOKEN_SALT, read_signed_token
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user objects."""
@@ -26,7 +30,7 @@ class UserSerializer(serializers.ModelSerializer):
 
         if password:
             user.set_password(password)
-            user.save()
+            user.save(update_fields=['password'])
             
         return user
 
@@ -52,4 +56,44 @@ class AuthTokenSerializer(serializers.Serializer):
             raise serializers.ValidationError(msg,code='authorization')
         
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for a signed refresh token."""
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        """Validate the token and that it was not revoked."""
+        msg = _('Invalid, expired or revoked refresh token.')
+        try:
+            user_id, epoch = read_signed_token(
+                attrs['refresh'],
+                REFRESH_TOKEN_SALT,
+                settings.AUTH_REFRESH_TOKEN_LIFETIME,
+            )
+        except signing.BadSignature:
+            raise serializers.ValidationError(msg, code='authorization')
+
+        user = get_user_model().objects.filter(
+            pk=user_id, is_active=True, token_epoch=epoch,
+        ).first()
+        if user is None:
+            raise serializers.ValidationError(msg, code='authorization')
+
+        attrs['user'] = user
+        return attrs
+
+
+class TokenPairSerializer(serializers.Serializer):
+    """Serializer for a signed access and refresh token pair."""
+    access = serializers.CharField()
+    refresh = serializers.CharField()
+    expires_in = serializers.IntegerField(
+        help_text='Seconds until the access token expires.'
+    )
+
+
+class AuthTokenResponseSerializer(TokenPairSerializer):
+    """Serializer for the tokens issued on login."""
+    token = serializers.CharField(help_text='Opaque token.')
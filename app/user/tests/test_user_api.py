@@ -3,6 +3,7 @@ Test for the user API.
 """
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -11,6 +12,7 @@ from rest_framework import status
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
 ME_URL = reverse('user:me')
 
 
@@ -23,6 +25,7 @@ class PublicUserApiTests(TestCase):
     """Test the public feature of the user API."""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
     
     # TEST 12
@@ -85,7 +88,46 @@ class PublicUserApiTests(TestCase):
         res = self.client.post(TOKEN_URL,payload)
 
         self.assertIn('token',res.data)
+        self.assertIn('access', res.data)
+        self.assertIn('refresh', res.data)
         self.assertEqual(res.status_code,status.HTTP_200_OK)
+
+    def test_refresh_token(self):
+        """Test a refresh token is exchanged for a new token pair."""
+        create_user(email='test@gmail.com', password='test-pass-123')
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@gmail.com',
+            'password': 'test-pass-123',
+        })
+
+        res = self.client.post(REFRESH_URL, {'refresh': res.data['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {res.data["access"]}'
+        )
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_revoked(self):
+        """Test a refresh token stops working after a password change."""
+        user = create_user(email='test@gmail.com', password='test-pass-123')
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@gmail.com',
+            'password': 'test-pass-123',
+        })
+        user.set_password('new-pass-123')
+        user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': res.data['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_invalid(self):
+        """Test a forged refresh token is rejected."""
+        res = self.client.post(REFRESH_URL, {'refresh': 'not-a-token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
     
     # TEST 16
     def test_create_token_bad_credentials(self):
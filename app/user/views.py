@@ -1,30 +1,89 @@
 """
 Views for the user API.
 """
-from rest_framework import generics , authentication , permissions
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer , AuthTokenSerializer
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+    issue_signed_tokens,
+)
+from core.throttling import EmailThrottle, IPThrottle
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    AuthTokenResponseSerializer,
+    RefreshTokenSerializer,
+    TokenPairSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
+    # Credentials sent in headers would be checked before the throttles.
+    authentication_classes = []
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'signup'
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user."""
+    """Create a new auth token for user.
+
+    Returns the opaque token along with a signed access and refresh
+    token pair.
+    """
     serializer_class = AuthTokenSerializer
+    authentication_classes = []
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'login'
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    @extend_schema(responses=AuthTokenResponseSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+
+        return Response({'token': token.key, **issue_signed_tokens(user)})
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new signed token pair."""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = []
+    throttle_classes = [IPThrottle]
+    throttle_scope = 'refresh'
+
+    @extend_schema(responses=TokenPairSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(
+            issue_signed_tokens(serializer.validated_data['user'])
+        )
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authentication user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authentication user."""
-        return self.request.user
\ No newline at end of file
+        user = self.request.user
+        if user.get_deferred_fields():
+            user.refresh_from_db()
+        return user